@@ -1,18 +1,43 @@
 import pandas as pd
 import numpy as np
 import warnings
-import sys
-import os
-from datetime import timedelta
+from numba import njit, prange
 
-# Fix for 'io' module conflict
-sys.path.append(os.path.join(os.path.dirname(__file__), 'covered_calls')) # Adjust import path if needed based on root
-from covered_calls.io.ingest import fetch_data
-from covered_calls.models.garch import GarchModel
+# Relative imports (run as: python -m covered_calls.backtest)
+from .io.ingest import fetch_data
+from .features.returns import compute_log_returns
+from .models.garch import GarchModel, evolve_terminal, standard_t
 
 warnings.filterwarnings("ignore")
 
-def run_backtest(ticker="GME", window_years=2, horizon_days=7):
+@njit(parallel=True, cache=True)
+def _run_steps(params, sigma2_0, current_prices, final_prices, z, ks, target_probs, hits_out, brier_out):
+    """
+    Scores every backtest period in parallel. For step s: simulates terminal
+    prices from (params[s], sigma2_0[s], current_prices[s]) with innovations
+    z[s], takes the ks order statistics as target strikes and writes the
+    hit / Brier contribution of each target to row s of hits_out / brier_out.
+    """
+    n_steps, n_paths, _ = z.shape
+    for s in prange(n_steps):
+        omega, alpha, gamma, beta = params[s, 0], params[s, 1], params[s, 2], params[s, 3]
+        terminal = np.empty(n_paths)
+        for i in range(n_paths):
+            terminal[i] = evolve_terminal(omega, alpha, gamma, beta, sigma2_0[s], current_prices[s], z[s, i])
+        
+        # Order statistics for every target in one partition (no full sort)
+        part = np.partition(terminal, ks)
+        for j in range(ks.shape[0]):
+            outcome = 1.0 if final_prices[s] <= part[ks[j]] else 0.0
+            hits_out[s, j] = outcome
+            brier_out[s, j] = (outcome - target_probs[j]) ** 2
+
+def run_backtest(ticker="GME", window_years=2, target_probs=(0.60, 0.65, 0.70, 0.75, 0.80),
+                 horizon_days=7, refit_every=20, seed=42):
+    """
+    Probability calibration backtest. target_probs is the sweep of
+    aggression levels; pass a single value, e.g. (0.70,), to check one target.
+    """
     print(f"--- Starting Probability Calibration Backtest for {ticker} ---")
     
     # 1. Get History
@@ -20,11 +45,7 @@ def run_backtest(ticker="GME", window_years=2, horizon_days=7):
     daily, _, _, _ = fetch_data(ticker, lookback_years=window_years + 2)
     
     # Prep data
-    daily['prev_close'] = daily['close'].shift(1)
-    daily = daily[(daily['close'] > 0) & (daily['prev_close'] > 0)]
-    daily['log_ret'] = np.log(daily['close'] / daily['prev_close'])
-    daily = daily.dropna(subset=['log_ret'])
-    daily = daily[np.isfinite(daily['log_ret'])].reset_index(drop=True)
+    daily = compute_log_returns(daily).reset_index(drop=True)
     
     # 2. Define Test Points
     min_history = 252
@@ -35,42 +56,68 @@ def run_backtest(ticker="GME", window_years=2, horizon_days=7):
     test_indices = range(min_history, len(daily) - horizon_days, 5)
     
     # Parameter Sweep Settings
-    target_probs = [0.60, 0.65, 0.70, 0.75, 0.80]
-    results = {tp: {'hits': 0, 'total': 0, 'brier': []} for tp in target_probs}
+    target_probs = list(target_probs)
+    results = {tp: {'hits': 0, 'total': 0, 'brier_sum': 0.0} for tp in target_probs}
+    
+    if len(target_probs) == 1:
+        print(f"Running backtest on {len(test_indices)} periods at target {target_probs[0]:.0%}...")
+    else:
+        print(f"Running backtest on {len(test_indices)} periods across {len(target_probs)} aggression levels...")
     
-    print(f"Running backtest on {len(test_indices)} periods across {len(target_probs)} aggression levels...")
+    log_ret_arr = daily['log_ret'].to_numpy(dtype=np.float64)
+    close_arr = daily['close'].to_numpy(dtype=np.float64)
+    garch = None
+    fit_end = 0
+    
+    # Collect the model state at every test point, then simulate all of them at once
+    step_params, step_sigma2, step_spot, step_final = [], [], [], []
     
     for i, t in enumerate(test_indices):
         if i % 10 == 0: print(f"Processing step {i}/{len(test_indices)}...")
         
-        train_data = daily.iloc[:t]
-        current_price = train_data['close'].iloc[-1]
-        
-        future_data = daily.iloc[t : t + horizon_days]
-        final_price = future_data['close'].iloc[-1]
+        current_price = close_arr[t - 1]
+        final_price = close_arr[t + horizon_days - 1]
         
         try:
-            garch = GarchModel(train_data['log_ret'])
-            # Use price clamping from recent fix in model
-            sim_prices, _ = garch.simulate_paths(n_days=horizon_days, n_paths=10000, current_price=current_price)
-            terminal_prices = sim_prices[:, -1]
-            
-            # Check each target probability against this simulation
-            for tp in target_probs:
-                k_target = np.percentile(terminal_prices, tp * 100)
-                is_otm = final_price <= k_target
-                
-                results[tp]['total'] += 1
-                if is_otm:
-                    results[tp]['hits'] += 1
-                
-                outcome = 1.0 if is_otm else 0.0
-                results[tp]['brier'].append((outcome - tp) ** 2)
-                
+            # Refit every `refit_every` steps; in between, roll the
+            # conditional variance forward with the frozen parameters.
+            if garch is None or i % refit_every == 0:
+                garch = None
+                garch = GarchModel.from_array(log_ret_arr[:t])
+            else:
+                garch.update(log_ret_arr[fit_end:t])
+            fit_end = t
         except Exception as e:
             continue
+            
+        step_params.append(garch.sim_params)
+        step_sigma2.append(garch.last_sigma2)
+        step_spot.append(current_price)
+        step_final.append(final_price)
+
+    if step_params:
+        print(f"Simulating {len(step_params)} periods...")
+        n_paths = 10000
+        params = np.array(step_params)
+        ks = np.minimum((np.array(target_probs) * n_paths).astype(np.int64), n_paths - 1)
+        
+        # All innovations drawn in one call. Shape: (n_steps, n_paths, horizon_days)
+        rng = np.random.default_rng(seed)
+        z = standard_t(rng, params[:, 4, None, None], (len(params), n_paths, horizon_days))
+        
+        # Shape: (n_steps, len(target_probs)); reduced over steps below
+        hits_out = np.zeros((len(params), len(target_probs)))
+        brier_out = np.zeros((len(params), len(target_probs)))
+        _run_steps(params[:, :4].astype(np.float32), np.array(step_sigma2, dtype=np.float32),
+                   np.array(step_spot), np.array(step_final), z,
+                   ks, np.array(target_probs), hits_out, brier_out)
+        
+        for j, tp in enumerate(target_probs):
+            results[tp]['total'] = len(params)
+            results[tp]['hits'] = int(hits_out[:, j].sum())
+            results[tp]['brier_sum'] = brier_out[:, j].sum()
 
-    if results[0.60]['total'] == 0:
+    if results[target_probs[0]]['total'] == 0:
         print("No valid backtest steps completed.")
         return
 
@@ -86,7 +133,7 @@ def run_backtest(ticker="GME", window_years=2, horizon_days=7):
         if res['total'] == 0: continue
         
         realized = res['hits'] / res['total']
-        brier = np.mean(res['brier'])
+        brier = res['brier_sum'] / res['total']
         
         status = "OK"
         if realized < tp - 0.05: status = "RISKY"
@@ -96,6 +143,9 @@ def run_backtest(ticker="GME", window_years=2, horizon_days=7):
         print(f"{tp:<12.0%} | {realized:<14.1%} | {brier:<8.4f} | {status}")
         
     print("="*60)
+    if len(target_probs) == 1:
+        # Single target: no sweep to tune across
+        return
     print("Aggression Tuning Guide:")
     print(" - SAFE++: You are leaving money on the table. Lower target.")
     print(" - RISKY:  Model is underestimating risk. Raise target.")
@@ -2,30 +2,34 @@ import argparse
 import pandas as pd
 import numpy as np
 import json
+import logging
 import os
 import glob
+import sys
 import yfinance as yf
+from dataclasses import replace
 from datetime import datetime
 
 # Relative imports
-from .config import Config
+from .config import get_config
 from .io.ingest import fetch_data
 from .features.resistance import detect_resistance
+from .features.returns import compute_log_returns
 from .options.cleaning import clean_options
 from .options.iv_surface import fit_svi
 from .models.garch import GarchModel
 from .montecarlo.breach import calculate_probabilities
 from .optimizer.choose_strike import select_strike
 
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64)):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super(NumpyEncoder, self).default(obj)
+# Optional fast JSON writer
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _to_py(rec):
+    """Casts NumPy scalars in a recommendation to plain Python types, once."""
+    return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in rec.items()}
 
 def load_earnings_dates(ticker, base_dir):
     search_path = os.path.join(base_dir, ticker, "**", "events_earnings.*")
@@ -69,14 +73,77 @@ def get_next_earnings_live(ticker):
         return None
     return None
 
+def _process_expiry(exp_date, group, sim_prices, last_garch_sigma, spot, cfg, res_df):
+    """
+    Cleans, fits and scores a single expiry. sim_prices holds the simulated
+    paths truncated to this expiry's horizon. Returns the recommendation or None.
+    """
+    dte = group.iloc[0]['dte']
+    print(f"Processing DTE {dte} ({exp_date.date()})...")
+
+    clean_group = clean_options(group, min_oi=cfg.min_oi)
+    if clean_group.empty:
+        print(f"  [WARNING] All {len(group)} options dropped by cleaner.")
+        return None
+    
+    strikes = clean_group['strike'].values
+    clean_group['impliedVolatility'] = clean_group['impliedVolatility'].fillna(0.5)
+    ivs = clean_group['impliedVolatility'].values
+    
+    T_years = dte / 365.0
+    if T_years == 0: T_years = 1/365.0
+    
+    svi_params = fit_svi(strikes, ivs, T_years, spot)
+    
+    garch_vol_annual = last_garch_sigma * np.sqrt(252)
+    
+    calls = clean_group[clean_group['side'] == 'call']
+    market_iv = 0.0
+    if not calls.empty:
+        idx_atm = (calls['strike'] - spot).abs().idxmin()
+        market_iv = calls.loc[idx_atm, 'impliedVolatility']
+        
+    simulation_vol = last_garch_sigma
+    if market_iv > 2.0 * garch_vol_annual:
+        print(f"  [WARNING] Market IV ({market_iv:.2%}) > 2.0x GARCH. Using Market IV.")
+        simulation_vol = market_iv / np.sqrt(252)
+    
+    call_strikes = calls['strike'].unique()
+    p_otm, se_otm, p_touch = calculate_probabilities(
+        sim_prices, call_strikes, T_years, simulation_vol
+    )
+    z_score = 1.645
+    lcb = p_otm - z_score * se_otm
+    p_df = pd.DataFrame({'strike': call_strikes, 'p_otm': p_otm, 'p_lcb': lcb, 'p_touch': p_touch})
+        
+    rec = select_strike(clean_group, p_df, res_df, cfg, svi_params)
+    if not rec:
+        print("  -> No feasible strike found.")
+        return None
+    
+    rec['dte'] = dte
+    rec['expiration'] = str(rec['expiration'])
+    # Show net premium in logs
+    gross = rec['effective_price'] * 100
+    net = gross - cfg.commission_fee
+    print(f"  -> Recommended: Strike {rec['strike']} (Prob: {rec['p_otm']:.2%}, Net Profit: ${net:.2f}, Yield: {rec['yield']:.2%})")
+    return _to_py(rec)
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--ticker", type=str, default="GME")
     parser.add_argument("--out_dir", type=str, default="./output")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="-v: strike filter summaries, -vv: per-strike diagnostics")
     args = parser.parse_args()
     
+    # -v/-vv only raise this package's loggers; third-party ones (numba,
+    # urllib3, yfinance) stay at the root's WARNING
+    logging.basicConfig(level=logging.WARNING, format="%(message)s", stream=sys.stdout)
+    logging.getLogger(__package__).setLevel((logging.WARNING, logging.INFO, logging.DEBUG)[min(args.verbose, 2)])
+    
     os.makedirs(args.out_dir, exist_ok=True)
-    cfg = Config(ticker=args.ticker)
+    cfg = replace(get_config(), ticker=args.ticker)
     
     print(f"--- Starting Analysis for {cfg.ticker} ---")
     
@@ -84,11 +151,7 @@ def main():
     daily, intraday, opts, spot = fetch_data(cfg.ticker)
 
     # Data Prep
-    daily['prev_close'] = daily['close'].shift(1)
-    daily = daily[(daily['close'] > 0) & (daily['prev_close'] > 0)]
-    daily['log_ret'] = np.log(daily['close'] / daily['prev_close'])
-    daily = daily.dropna(subset=['log_ret'])
-    daily = daily[np.isfinite(daily['log_ret'])]
+    daily = compute_log_returns(daily)
     
     if len(daily) < 252:
         print(f"Error: Insufficient daily data ({len(daily)} rows).")
@@ -134,84 +197,54 @@ def main():
         print(f"Immediate Resistance Zone: {res_df.iloc[0]['level']:.2f} (Str: {res_df.iloc[0]['strength']:.1f})")
     
     print("Fitting GARCH Model...")
-    garch = GarchModel(daily['log_ret'])
+    rng = np.random.default_rng(cfg.mc_seed)
+    garch = GarchModel(daily['log_ret'], rng=rng)
     
-    recommendations = []
     target_dtes = cfg.dte_grid
     today = datetime.now()
     
-    for exp_date, group in opts.groupby('expiration'):
-        dte = group.iloc[0]['dte']
-        
-        if not any(abs(dte - t) <= 2 for t in target_dtes):
-            continue
-            
-        print(f"Processing DTE {dte} ({exp_date.date()})...")
-        
-        # --- Event Shield Check ---
-        if next_earnings_date:
-            days_to_earn = (next_earnings_date - today).days
-            if 0 <= days_to_earn <= dte + 1:
-                print(f"  [SKIP] Earnings in {days_to_earn} days (Date: {next_earnings_date.date()}).")
-                continue
-
-        clean_group = clean_options(group, min_oi=cfg.min_oi)
-        if clean_group.empty:
-            print(f"  [WARNING] All {len(group)} options dropped by cleaner.")
-            continue
-        
-        strikes = clean_group['strike'].values
-        clean_group['impliedVolatility'] = clean_group['impliedVolatility'].fillna(0.5)
-        ivs = clean_group['impliedVolatility'].values
-        
-        T_years = dte / 365.0
-        if T_years == 0: T_years = 1/365.0
-        
-        svi_params = fit_svi(strikes, ivs, T_years, spot)
-        
-        last_garch_sigma = garch.res.conditional_volatility.iloc[-1] / 100.0
-        garch_vol_annual = last_garch_sigma * np.sqrt(252)
-        
-        calls = clean_group[clean_group['side'] == 'call']
-        market_iv = 0.0
-        if not calls.empty:
-            idx_atm = (calls['strike'] - spot).abs().idxmin()
-            market_iv = calls.loc[idx_atm, 'impliedVolatility']
-            
-        simulation_vol = last_garch_sigma
-        if market_iv > 2.0 * garch_vol_annual:
-            print(f"  [WARNING] Market IV ({market_iv:.2%}) > 2.0x GARCH. Using Market IV.")
-            simulation_vol = market_iv / np.sqrt(252)
-        
-        n_days = max(int(dte), 1)
-        sim_prices, _ = garch.simulate_paths(n_days, cfg.mc_paths, spot)
-        
-        p_otm_dict = {}
-        for k in calls['strike'].unique():
-            p_otm, se_otm, p_touch = calculate_probabilities(
-                sim_prices, k, T_years, simulation_vol
-            )
-            z_score = 1.645
-            lcb = p_otm - z_score * se_otm
-            p_otm_dict[k] = (p_otm, lcb, p_touch)
-            
-        rec = select_strike(clean_group, p_otm_dict, res_df, cfg, svi_params)
+    # Pre-filter expiries once by DTE instead of rejecting groups in the loop
+    # (any DTE within +/-2 days of a grid point is allowed)
+    allowed_dtes = {d for t in target_dtes for d in range(t - 2, t + 3)}
+    keep_dtes = {d for d in opts['dte'].unique() if d in allowed_dtes}
+    
+    # --- Event Shield Check ---
+    if next_earnings_date:
+        days_to_earn = (next_earnings_date - today).days
+        if days_to_earn >= 0:
+            # Expiries with dte + 1 >= days_to_earn straddle the event
+            max_allowed_dte = days_to_earn - 2
+            shielded = sorted(int(d) for d in keep_dtes if d > max_allowed_dte)
+            if shielded:
+                print(f"  [SKIP] Earnings in {days_to_earn} days (Date: {next_earnings_date.date()}). Skipping DTE {shielded}.")
+                keep_dtes.difference_update(shielded)
+    
+    opts_f = opts[opts['dte'].isin(keep_dtes)]
+    
+    # Paths are shared across expiries: simulate once at the longest horizon
+    # any expiry needs and slice shorter horizons from the prefix.
+    expiries = list(opts_f.groupby('expiration'))
+    if expiries:
+        max_days = max(max(int(d), 1) for d in keep_dtes)
+        sim_paths, _ = garch.simulate_paths(max_days, cfg.mc_paths, spot)
+    last_garch_sigma = np.sqrt(garch.last_sigma2) / 100.0
+    
+    # Expiries run in-process: a spawned pool pays ~2 s of imports per worker,
+    # far more than the ~20-70 ms each expiry takes here
+    recommendations = []
+    for exp_date, group in expiries:
+        n_days = max(int(group.iloc[0]['dte']), 1)
+        rec = _process_expiry(exp_date, group, sim_paths[:, :n_days + 1], last_garch_sigma, spot, cfg, res_df)
         if rec:
-            rec['dte'] = dte
             recommendations.append(rec)
-            # Show net premium in logs
-            gross = rec['effective_price'] * 100
-            net = gross - cfg.commission_fee
-            print(f"  -> Recommended: Strike {rec['strike']} (Prob: {rec['p_otm']:.2%}, Net Profit: ${net:.2f}, Yield: {rec['yield']:.2%})")
-        else:
-            print("  -> No feasible strike found.")
 
     out_file = os.path.join(args.out_dir, f"{cfg.ticker}_recommendations.json")
-    for r in recommendations:
-        r['expiration'] = str(r['expiration'])
-        
-    with open(out_file, 'w') as f:
-        json.dump(recommendations, f, indent=2, cls=NumpyEncoder)
+    if orjson is not None:
+        with open(out_file, 'wb') as f:
+            f.write(orjson.dumps(recommendations, option=orjson.OPT_INDENT_2))
+    else:
+        with open(out_file, 'w') as f:
+            json.dump(recommendations, f, indent=2)
         
     print(f"Done. Results saved to {out_file}")
 
@@ -1,29 +1,45 @@
+import json
 import os
 from dataclasses import dataclass, field
-from typing import List
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Tuple
 
-# Load environment variables from .env file
-load_dotenv()
+# Parsed .env values, reused across processes until .env changes. The file
+# holds credentials, so it lives in the user's cache dir and is owner-only
+_ENV_CACHE = os.path.join(
+    os.path.expanduser(os.environ.get("XDG_CACHE_HOME") or "~/.cache"), "covered_calls", "env_cache.json"
+)
+# Older versions wrote the cache into the package itself
+_LEGACY_ENV_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_env_cache.py")
 
-@dataclass
+def _env(name: str, default: str = "", cast=str):
+    """Field default read from the environment when Config is instantiated."""
+    return field(default_factory=lambda: cast(os.getenv(name, default)))
+
+@dataclass(frozen=True, slots=True)
 class Config:
     ticker: str = "GME"
     
     # Data Provider Configuration
-    api_provider: str = os.getenv("API_PROVIDER", "alpaca")
-    alpaca_key: str = os.getenv("ALPACA_KEY", "")
-    alpaca_secret: str = os.getenv("ALPACA_SECRET", "")
-    alpaca_endpoint: str = os.getenv("ALPACA_ENDPOINT", "https://paper-api.alpaca.markets")
+    api_provider: str = _env("API_PROVIDER", "alpaca")
+    alpaca_key: str = _env("ALPACA_KEY")
+    alpaca_secret: str = _env("ALPACA_SECRET")
+    alpaca_endpoint: str = _env("ALPACA_ENDPOINT", "https://paper-api.alpaca.markets")
+    
+    # On-disk data cache (empty string disables)
+    cache_dir: str = _env("CACHE_DIR", "~/.cache/covered_calls")
+    # Seconds a fetched options chain/spot snapshot may be reused (0 = always live)
+    quote_cache_ttl: float = _env("QUOTE_CACHE_TTL", "0", float)
 
     # Strategy Parameters
     p_target_min: float = 0.58
     p_target_max: float = 0.60
     alpha_lcb: float = 0.05      # 5% one-sided confidence
     mc_paths: int = 50000        # Monte Carlo paths
+    mc_seed: int = 42            # Seed for the shared Monte Carlo RNG
     
     # DTE Grid: Focused on Short-Term Weekly Options
-    dte_grid: List[int] = field(default_factory=lambda: [0, 5, 7, 14])
+    dte_grid: Tuple[int, ...] = (0, 5, 7, 14)
     
     # Transaction Costs (Interactive Brokers)
     commission_fee: float = 2.0  # $2.00 per contract (flat fee)
@@ -34,7 +50,7 @@ class Config:
     
     # Resistance Parameters
     res_window_high: int = 20    
-    res_ma_periods: List[int] = field(default_factory=lambda: [20, 50, 200])
+    res_ma_periods: Tuple[int, ...] = (20, 50, 200)
     res_zone_width: float = 0.01 
     
     # Risk Constraints
@@ -49,3 +65,65 @@ class Config:
     # Optimization Weights
     lambda_res: float = 0.5      
     lambda_risk: float = 1.0
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """
+    Returns the process-wide Config. The .env file is loaded on the first
+    call only; use dataclasses.replace() for per-run overrides.
+    """
+    _load_env()
+    return Config()
+
+def _find_dotenv():
+    """Nearest .env walking up from this package, as dotenv.find_dotenv() does."""
+    path = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(path, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+def _load_env():
+    """
+    Loads .env into os.environ without overriding existing variables.
+    Parsed values are cached as JSON in the user cache dir (mode 0600) and
+    invalidated by the .env path and mtime; python-dotenv is only imported
+    on a cache miss.
+    """
+    env_path = _find_dotenv()
+    if env_path is None:
+        return
+    mtime = os.path.getmtime(env_path)
+    
+    env = None
+    try:
+        with open(_ENV_CACHE) as f:
+            cached = json.load(f)
+        if cached["path"] == env_path and cached["mtime"] == mtime:
+            env = cached["env"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    if env is None:
+        from dotenv import dotenv_values
+        env = {k: v for k, v in dotenv_values(env_path).items() if v is not None}
+        _write_env_cache(env_path, mtime, env)
+        
+    for key, value in env.items():
+        os.environ.setdefault(key, value)
+
+def _write_env_cache(env_path, mtime, env):
+    try:
+        os.makedirs(os.path.dirname(_ENV_CACHE), mode=0o700, exist_ok=True)
+        fd = os.open(_ENV_CACHE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)  # O_CREAT's mode does not apply to an existing file
+        with os.fdopen(fd, "w") as f:
+            json.dump({"path": env_path, "mtime": mtime, "env": env}, f)
+        if os.path.exists(_LEGACY_ENV_CACHE):
+            os.remove(_LEGACY_ENV_CACHE)
+    except OSError as e:
+        print(f"  [Warning] Could not write .env cache: {e}")
@@ -7,26 +7,34 @@ def detect_resistance(daily: pd.DataFrame, intraday: pd.DataFrame, current_price
     Implements clustering to merge nearby levels.
     """
     raw_levels = []
+    # Only the latest window matters: reduce tail slices instead of full rolling passes
+    high = np.ascontiguousarray(daily['high'].to_numpy(), dtype=np.float64)
+    close = np.ascontiguousarray(daily['close'].to_numpy(), dtype=np.float64)
     
     # 1. Swing Highs (Donchian Channel Top)
     for window in [20, 50, 100]:
-        val = daily['high'].rolling(window).max().iloc[-1]
+        if window > len(high):
+            continue
+        val = float(high[-window:].max())
         if val > current_price:
             raw_levels.append({'level': val, 'type': f'{window}d_high', 'strength': 1.0})
             
     # 2. Simple Moving Averages
     for window in [20, 50, 200]:
-        val = daily['close'].rolling(window).mean().iloc[-1]
+        if window > len(close):
+            continue
+        val = float(close[-window:].mean())
         if val > current_price:
             raw_levels.append({'level': val, 'type': f'SMA_{window}', 'strength': 0.8})
             
     # 3. Anchored VWAP (Approximate from Intraday)
     if not intraday.empty:
-        intraday = intraday.copy()
-        intraday['tp'] = (intraday['high'] + intraday['low'] + intraday['close']) / 3
-        intraday['cum_vol'] = intraday['volume'].cumsum()
-        intraday['cum_vol_price'] = (intraday['tp'] * intraday['volume']).cumsum()
-        vwap = intraday['cum_vol_price'].iloc[-1] / intraday['cum_vol'].iloc[-1]
+        # Only the session total is needed, so a single dot product replaces the cumsums
+        tp = (intraday['high'].to_numpy() + intraday['low'].to_numpy() + intraday['close'].to_numpy()) * (1.0 / 3.0)
+        vol = intraday['volume'].to_numpy()
+        vol_sum = vol.sum()
+        # Zero-volume sessions (e.g. pre-market only) have no VWAP
+        vwap = float(np.dot(tp, vol) / vol_sum) if vol_sum else 0.0
         
         if vwap > current_price:
             raw_levels.append({'level': vwap, 'type': 'VWAP_session', 'strength': 0.6})
@@ -40,41 +48,19 @@ def detect_resistance(daily: pd.DataFrame, intraday: pd.DataFrame, current_price
     # Sort by level
     raw_levels.sort(key=lambda x: x['level'])
     
-    # Clustering
-    clustered = []
-    if raw_levels:
-        current_cluster = [raw_levels[0]]
-        
-        for i in range(1, len(raw_levels)):
-            prev = current_cluster[-1]
-            curr = raw_levels[i]
-            
-            # Check if within zone_width (percentage difference)
-            if (curr['level'] - prev['level']) / prev['level'] <= zone_width:
-                current_cluster.append(curr)
-            else:
-                # Process completed cluster
-                clustered.append(_merge_cluster(current_cluster))
-                current_cluster = [curr]
-        
-        # Process last cluster
-        if current_cluster:
-            clustered.append(_merge_cluster(current_cluster))
+    # Clustering: a new zone starts wherever the gap to the previous level exceeds zone_width
+    lv = np.array([r['level'] for r in raw_levels])
+    st = np.array([r['strength'] for r in raw_levels])
+    seg_id = np.concatenate([[0], np.cumsum(np.diff(lv) / lv[:-1] > zone_width)])
+    
+    total_st = np.bincount(seg_id, weights=st)
+    weighted_lv = np.bincount(seg_id, weights=lv * st) / total_st
+    types = pd.Series([r['type'] for r in raw_levels]).groupby(seg_id).agg('+'.join)
             
-    df = pd.DataFrame(clustered)
+    df = pd.DataFrame({
+        'level': weighted_lv,
+        'type': types.to_numpy(),
+        'strength': total_st
+    })
     df = df.sort_values('level').reset_index(drop=True)
     return df
-
-def _merge_cluster(cluster):
-    if len(cluster) == 1:
-        return cluster[0]
-        
-    total_strength = sum(item['strength'] for item in cluster)
-    weighted_level = sum(item['level'] * item['strength'] for item in cluster) / total_strength
-    
-    types = [item['type'] for item in cluster]
-    return {
-        'level': weighted_level,
-        'type': '+'.join(types),
-        'strength': total_strength
-    }
@@ -0,0 +1,21 @@
+import pandas as pd
+import numpy as np
+
+def compute_log_returns(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the rows of daily that have a valid close-to-close log return,
+    with the return in a 'log_ret' column. Non-positive closes and non-finite
+    returns are dropped; the work is one NumPy pass and a single row selection.
+    """
+    close = daily['close'].to_numpy(dtype=np.float64)
+    prev = np.empty_like(close)
+    prev[:1] = np.nan
+    prev[1:] = close[:-1]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_ret = np.log(close / prev)
+    mask = np.isfinite(log_ret) & (close > 0) & (prev > 0)
+    
+    daily = daily.iloc[mask].copy()
+    daily['log_ret'] = log_ret[mask]
+    return daily
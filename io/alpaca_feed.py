@@ -1,8 +1,13 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from .interface import DataProvider
-from ..config import Config
+from functools import lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .interface import DataProvider, strip_tz
+from .cache import load_cached_bars, store_cached_bars
+from ..config import get_config
 
 # --- ALPACA IMPORTS ---
 try:
@@ -16,63 +21,116 @@ except ImportError:
 # Fallback import
 from .yahoo_feed import YahooProvider
 
+@lru_cache(maxsize=1)
+def _http_session():
+    """Keep-alive session shared by every Alpaca client in the process."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(connect=3, backoff_factor=0.5))
+    session.mount("https://", adapter)
+    return session
+
 class AlpacaProvider(DataProvider):
     def __init__(self):
-        self.cfg = Config()
+        self.cfg = get_config()
         if not self.cfg.alpaca_key or not self.cfg.alpaca_secret:
             raise ValueError("Alpaca API keys not found in environment variables.")
             
         self.stock_client = StockHistoricalDataClient(self.cfg.alpaca_key, self.cfg.alpaca_secret)
         self.option_client = OptionHistoricalDataClient(self.cfg.alpaca_key, self.cfg.alpaca_secret)
+        # Clients build a private Session each; share one so sockets are reused across requests
+        self.stock_client._session = _http_session()
+        self.option_client._session = _http_session()
+        self._yahoo = None  # Created on first options fallback, then reused
 
     def fetch_data(self, ticker: str, lookback_years: int = 6):
-        print(f"[AlpacaProvider] Fetching data for {ticker}...")
+        results = self.fetch_data_batch([ticker], lookback_years)
+        if ticker not in results:
+            raise ValueError(f"No bar data returned from Alpaca for {ticker}.")
+        return results[ticker]
+
+    def fetch_data_batch(self, tickers: list[str], lookback_years: int = 6):
+        """
+        Fetches several tickers with one bars request per timeframe.
+        Returns: {ticker: (daily_df, intraday_df, options_df, spot_price)}
+        """
+        print(f"[AlpacaProvider] Fetching data for {', '.join(tickers)}...")
         
         # 1. Setup Dates
         end_dt = datetime.now()
         start_dt_daily = end_dt - timedelta(days=lookback_years*365)
+        start_dt_intra = end_dt - timedelta(days=59)
+        
+        # Only bars after each ticker's cached history are requested
+        # (bars are requested unadjusted, so closed sessions never change upstream)
+        daily_cache = {t: load_cached_bars(t, "alpaca", "1d", start_dt_daily) for t in tickers}
+        intra_cache = {t: load_cached_bars(t, "alpaca", "1m", start_dt_intra) for t in tickers}
         
         # 2. Daily History (Force IEX Feed for Free Data)
         try:
             req_daily = StockBarsRequest(
-                symbol_or_symbols=ticker,
+                symbol_or_symbols=tickers,
                 timeframe=TimeFrame.Day,
-                start=start_dt_daily,
+                start=min(start for _, start in daily_cache.values()),
                 end=end_dt,
                 feed="iex"  # <--- CRITICAL FIX: Use string "iex" instead of Enum
             )
             bars_daily = self.stock_client.get_stock_bars(req_daily)
-            daily_df = bars_daily.df.reset_index()
         except Exception as e:
             raise ValueError(f"Failed to fetch Daily Data from Alpaca. Check API Keys. Error: {e}")
-        
-        # Map Columns
-        daily_df = daily_df.rename(columns={
-            'timestamp': 'timestamp', 
-            'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'volume'
-        })
-        daily_df['timestamp'] = daily_df['timestamp'].dt.tz_localize(None)
-        spot = daily_df['close'].iloc[-1]
 
         # 3. Intraday History (Force IEX Feed)
-        start_dt_intra = end_dt - timedelta(days=59)
         req_intra = StockBarsRequest(
-            symbol_or_symbols=ticker,
+            symbol_or_symbols=tickers,
             timeframe=TimeFrame.Minute, 
-            start=start_dt_intra,
+            start=min(start for _, start in intra_cache.values()),
             end=end_dt,
             feed="iex"  # <--- CRITICAL FIX: Use string "iex"
         )
         bars_intra = self.stock_client.get_stock_bars(req_intra)
-        intraday_df = bars_intra.df.reset_index()
-        intraday_df = intraday_df.rename(columns={
-            'timestamp': 'timestamp', 
-            'open': 'open', 'high': 'high', 'low': 'low', 'close': 'close', 'volume': 'volume'
-        })
-        intraday_df['timestamp'] = intraday_df['timestamp'].dt.tz_localize(None)
+        
+        # Split the (symbol, timestamp) MultiIndex frames per ticker
+        daily_groups = self._split_bars(bars_daily.df)
+        intra_groups = self._split_bars(bars_intra.df)
+        empty = pd.DataFrame()
+        
+        results = {}
+        for ticker in tickers:
+            daily_df = store_cached_bars(
+                ticker, "alpaca", "1d", start_dt_daily, daily_cache[ticker][0],
+                self._format_bars(daily_groups.get(ticker, empty)),
+            )
+            if daily_df.empty:
+                print(f"  [WARNING] No daily bars returned for {ticker}. Skipping.")
+                continue
+            spot = daily_df['close'].iloc[-1]
+            
+            intraday_df = store_cached_bars(
+                ticker, "alpaca", "1m", start_dt_intra, intra_cache[ticker][0],
+                self._format_bars(intra_groups.get(ticker, empty)),
+            )
+            options = self._fetch_options(ticker, spot)
+            results[ticker] = (daily_df, intraday_df, options, spot)
+            
+        return results
+
+    @staticmethod
+    def _split_bars(df):
+        if df.empty:
+            return {}
+        return {sym: grp for sym, grp in df.groupby(level='symbol')}
+
+    @staticmethod
+    def _format_bars(bars):
+        """Flattens a bars frame to the provider schema with naive timestamps."""
+        if bars.empty:
+            return pd.DataFrame()
+        df = bars.reset_index()
+        df['timestamp'] = strip_tz(df['timestamp'])
+        return df
 
+    def _fetch_options(self, ticker, spot):
         # 4. Options Chain
-        print("Fetching Options Chain...")
+        print(f"Fetching Options Chain for {ticker}...")
         
         try:
             # Try Alpaca Options First
@@ -83,66 +141,52 @@ class AlpacaProvider(DataProvider):
             print("  -> Falling back to Yahoo Finance for Options Data only...")
             
             # HYBRID FALLBACK: Use Yahoo just for options
-            yahoo_provider = YahooProvider()
-            # We only need the options part from Yahoo, but the interface returns all 4.
-            # We'll discard the yahoo price data and keep our clean Alpaca price data.
-            _, _, options, _ = yahoo_provider.fetch_data(ticker, lookback_years=1)
+            if self._yahoo is None:
+                self._yahoo = YahooProvider()
+            # Only the chains are needed; we keep our clean Alpaca price data.
+            options, _ = self._yahoo.fetch_options(ticker, spot)
             
             # Ensure the yahoo options dataframe has the 'underlying_price' from Alpaca
             options['underlying_price'] = spot
 
-        return daily_df, intraday_df, options, spot
+        return options
 
     def _fetch_alpaca_options(self, ticker, spot):
         """Helper to try fetching options from Alpaca."""
         req_chain = OptionChainRequest(underlying_symbol=ticker)
         chain_res = self.option_client.get_option_chain(req_chain)
         
-        processed_rows = []
+        # Collect raw quote fields only; OSI symbols are parsed in one vectorized pass below
+        raw_rows = []
         
         for symbol, snapshot in chain_res.items():
-            try:
-                # Basic OSI Parse: Root + YYMMDD + Type + Strike
-                root_len = len(ticker)
-                remainder = symbol[root_len:]
-                yymmdd = remainder[:6]
-                type_char = remainder[6]
-                strike_str = remainder[7:]
-                
-                exp_date = datetime.strptime(yymmdd, "%y%m%d")
-                strike = float(strike_str) / 1000.0
-                side = 'call' if type_char == 'C' else 'put'
-                
-                dte = (exp_date - datetime.now()).days
-                
-                if not (0 <= dte <= 45):
-                    continue
-                
-                # Extract Data
-                bid = snapshot.latest_quote.bid_price if snapshot.latest_quote else 0.0
-                ask = snapshot.latest_quote.ask_price if snapshot.latest_quote else 0.0
-                last = snapshot.latest_trade.price if snapshot.latest_trade else 0.0
-                oi = snapshot.open_interest if snapshot.open_interest else 0
-                iv = snapshot.greeks.iv if snapshot.greeks else 0.0
-                
-                processed_rows.append({
-                    'strike': strike,
-                    'expiration': exp_date,
-                    'side': side,
-                    'bid': bid,
-                    'ask': ask,
-                    'mid': (bid + ask) / 2 if (bid and ask) else 0.0,
-                    'lastPrice': last,
-                    'openInterest': oi,
-                    'impliedVolatility': iv,
-                    'dte': dte,
-                    'underlying_price': spot
-                })
-                
-            except Exception:
-                continue
+            bid = snapshot.latest_quote.bid_price if snapshot.latest_quote else 0.0
+            ask = snapshot.latest_quote.ask_price if snapshot.latest_quote else 0.0
+            last = snapshot.latest_trade.price if snapshot.latest_trade else 0.0
+            oi = snapshot.open_interest if snapshot.open_interest else 0
+            iv = snapshot.greeks.iv if snapshot.greeks else 0.0
+            raw_rows.append((symbol, bid, ask, last, oi, iv))
 
-        if not processed_rows:
+        df = pd.DataFrame(raw_rows, columns=['symbol', 'bid', 'ask', 'lastPrice', 'openInterest', 'impliedVolatility'])
+        
+        # Basic OSI Parse: Root + YYMMDD + Type + Strike
+        remainder = df['symbol'].str[len(ticker):]
+        df['expiration'] = pd.to_datetime(remainder.str[:6], format="%y%m%d", errors='coerce')
+        df['side'] = np.where(remainder.str[6] == 'C', 'call', 'put')
+        df['strike'] = pd.to_numeric(remainder.str[7:], errors='coerce') / 1000.0
+        df['dte'] = (df['expiration'] - pd.Timestamp.now()).dt.days
+        
+        # Malformed symbols parse to NaN/NaT and fail the DTE window
+        df = df[(df['dte'] >= 0) & (df['dte'] <= 45) & df['strike'].notna()]
+        if df.empty:
             raise ValueError(f"No valid options data retrieved for {ticker}.")
 
-        return pd.DataFrame(processed_rows)
\ No newline at end of file
+        bid = df['bid'].to_numpy()
+        ask = df['ask'].to_numpy()
+        df = df.assign(
+            mid=np.where((bid != 0) & (ask != 0), (bid + ask) / 2, 0.0),
+            dte=df['dte'].astype(int),
+            underlying_price=spot,
+        )
+        return df[['strike', 'expiration', 'side', 'bid', 'ask', 'mid', 'lastPrice',
+                   'openInterest', 'impliedVolatility', 'dte', 'underlying_price']].reset_index(drop=True)
\ No newline at end of file
@@ -0,0 +1,155 @@
+import glob
+import os
+import pickle
+import time
+from datetime import date
+from functools import wraps
+import numpy as np
+import pandas as pd
+from ..config import get_config
+
+def cached_fetch(fetch):
+    """
+    Caches fetch_data results on disk, keyed by (ticker, date, lookback_years).
+    Options and spot are live quotes, so a snapshot is only reused for
+    QUOTE_CACHE_TTL seconds; the default of 0 disables it (bars still come
+    from the incremental bar cache). Daily/intraday frames are stored as
+    parquet, options and spot as a pickle, and snapshots from earlier days
+    are deleted when a new one is written.
+    """
+    @wraps(fetch)
+    def wrapper(ticker: str, lookback_years: int = 6):
+        cfg = get_config()
+        if not cfg.cache_dir or cfg.quote_cache_ttl <= 0:
+            return fetch(ticker, lookback_years)
+        
+        cache_dir = os.path.expanduser(cfg.cache_dir)
+        stem = os.path.join(cache_dir, f"{ticker}_{date.today():%Y%m%d}_{lookback_years}y")
+        daily_path = stem + "_daily.parquet"
+        intra_path = stem + "_intraday.parquet"
+        extra_path = stem + "_extra.pkl"
+        
+        if all(os.path.exists(p) for p in (daily_path, intra_path, extra_path)):
+            age = time.time() - os.path.getmtime(extra_path)
+            if age < cfg.quote_cache_ttl:
+                try:
+                    daily = read_bars(daily_path)
+                    intraday = read_bars(intra_path)
+                    with open(extra_path, 'rb') as f:
+                        options, spot = pickle.load(f)
+                    print(f"[Cache] Loaded {ticker} data from {cache_dir} (quotes {age:.0f}s old)")
+                    return daily, intraday, options, spot
+                except Exception as e:
+                    print(f"  [Warning] Cache read failed ({e}). Refetching.")
+        
+        daily, intraday, options, spot = fetch(ticker, lookback_years)
+        
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            _evict_snapshots(cache_dir, ticker, f"{ticker}_{date.today():%Y%m%d}_")
+            daily.to_parquet(daily_path, index=False)
+            intraday.to_parquet(intra_path, index=False)
+            with open(extra_path, 'wb') as f:
+                pickle.dump((options, spot), f)
+        except Exception as e:
+            print(f"  [Warning] Could not write data cache: {e}")
+            
+        return daily, intraday, options, spot
+    
+    return wrapper
+
+def _evict_snapshots(cache_dir: str, ticker: str, keep_prefix: str):
+    """Deletes the ticker's fetch_data snapshots from any day but today."""
+    for path in glob.glob(os.path.join(cache_dir, f"{glob.escape(ticker)}_{'[0-9]' * 8}_*")):
+        if not os.path.basename(path).startswith(keep_prefix):
+            os.remove(path)
+
+
+def compact_bars(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes bar dtypes: open/high/low as float32 (resistance and VWAP
+    tolerate it), close/volume kept float64 for the GARCH returns, timestamps
+    as numpy datetime64 and text columns on the pyarrow string backend.
+    """
+    if bars.empty:
+        return bars
+    dtypes = {c: np.float32 for c in ('open', 'high', 'low') if c in bars}
+    dtypes.update({c: np.float64 for c in ('close', 'volume') if c in bars})
+    if 'timestamp' in bars:
+        dtypes['timestamp'] = 'datetime64[ns]'
+    for c in bars.columns:
+        if c not in dtypes and (bars[c].dtype == object or pd.api.types.is_string_dtype(bars[c])):
+            dtypes[c] = 'string[pyarrow]'
+    return bars.astype(dtypes)
+
+def read_bars(path: str) -> pd.DataFrame:
+    """Reads a cached bar frame through the pyarrow backend."""
+    return compact_bars(pd.read_parquet(path, engine='pyarrow', dtype_backend='pyarrow'))
+
+def _bars_path(ticker: str, source: str, interval: str):
+    # Keyed by source too: providers differ in feed, adjustment and columns
+    cache_dir = get_config().cache_dir
+    if not cache_dir:
+        return None
+    return os.path.join(os.path.expanduser(cache_dir), f"{ticker}_{source}_{interval}.parquet")
+
+def load_cached_bars(ticker: str, source: str, interval: str, start):
+    """
+    Returns (cached_bars, fetch_start) for the incremental bar cache. Only bars
+    from the last two cached sessions onward are downloaded: the last one may
+    have been stored while still open, and the closed one before it is the
+    overlap bars_revised() checks for retroactive adjustments. A missing or
+    too-short cache yields (None, start).
+    """
+    path = _bars_path(ticker, source, interval)
+    if path is None or not os.path.exists(path):
+        return None, start
+    try:
+        cached = read_bars(path)
+    except Exception as e:
+        print(f"  [Warning] Bar cache read failed ({e}). Refetching.")
+        return None, start
+    # Allow a week of slack for weekends/holidays at the start of the window
+    if cached.empty or cached['timestamp'].min() > pd.Timestamp(start) + pd.Timedelta(days=7):
+        return None, start
+    sessions = cached['timestamp'].dt.normalize()
+    last = sessions.max()
+    prev = sessions[sessions < last].max()
+    return cached, max(pd.Timestamp(start), last if pd.isna(prev) else prev)
+
+def bars_revised(cached, new) -> bool:
+    """
+    True if closed-session bars in both frames disagree on close, i.e. the
+    source rewrote history (e.g. Yahoo split-adjusting past closes) and the
+    cache must be rebuilt. Bars of the last cached session are excluded,
+    since they may have been stored before the session closed.
+    """
+    if cached is None or cached.empty or new.empty:
+        return False
+    last = cached['timestamp'].max().normalize()
+    old = cached[cached['timestamp'] < last]
+    both = old[['timestamp', 'close']].merge(new[['timestamp', 'close']], on='timestamp')
+    if both.empty:
+        return False
+    return not np.allclose(both['close_x'].to_numpy(np.float64), both['close_y'].to_numpy(np.float64), rtol=1e-6)
+
+def store_cached_bars(ticker: str, source: str, interval: str, start, cached, new):
+    """Merges freshly fetched bars into the cache, trims to start and rewrites it."""
+    if cached is None or cached.empty:
+        bars = new
+    elif new.empty:
+        bars = cached
+    else:
+        bars = pd.concat([cached, new], ignore_index=True)
+        bars = bars.drop_duplicates('timestamp', keep='last').sort_values('timestamp')
+    if not bars.empty:
+        bars = compact_bars(bars[bars['timestamp'] >= pd.Timestamp(start)].reset_index(drop=True))
+    
+    path = _bars_path(ticker, source, interval)
+    if path is not None and not bars.empty:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            bars.to_parquet(path, index=False)
+        except Exception as e:
+            print(f"  [Warning] Could not write bar cache: {e}")
+    return bars
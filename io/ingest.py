@@ -1,14 +1,16 @@
 from .interface import DataProvider
 from .yahoo_feed import YahooProvider
 from .alpaca_feed import AlpacaProvider
-from ..config import Config
+from .cache import cached_fetch
+from ..config import get_config
 
+@cached_fetch
 def fetch_data(ticker: str, lookback_years: int = 6):
     """
     Factory function to fetch data from the configured provider.
     Returns: (daily_df, intraday_df, options_df, spot_price)
     """
-    cfg = Config()
+    cfg = get_config()
     provider_name = cfg.api_provider.lower()
     
     provider: DataProvider = None
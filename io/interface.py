@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
 import pandas as pd
 
+def strip_tz(s: pd.Series) -> pd.Series:
+    """Drops the timezone from a datetime Series, keeping wall time. Naive input is returned as is."""
+    return s.dt.tz_localize(None) if s.dt.tz is not None else s
+
 class DataProvider(ABC):
     @abstractmethod
     def fetch_data(self, ticker: str, lookback_years: int):
@@ -1,44 +1,35 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from .interface import DataProvider
+from functools import lru_cache
+from .interface import DataProvider, strip_tz
+from .cache import load_cached_bars, store_cached_bars, bars_revised
+
+# Ticker handles and expiry lists are reused for the rest of the run
+@lru_cache(maxsize=32)
+def _yf_ticker(ticker: str):
+    return yf.Ticker(ticker)
+
+@lru_cache(maxsize=32)
+def _yf_expiries(ticker: str):
+    return _yf_ticker(ticker).options
 
 class YahooProvider(DataProvider):
     def fetch_data(self, ticker: str, lookback_years: int = 6):
         """Fetches daily, intraday, and options chain using yfinance."""
         print(f"[YahooProvider] Fetching data for {ticker}...")
-        tk = yf.Ticker(ticker)
+        tk = _yf_ticker(ticker)
         
         # 1. Daily History (for GARCH)
-        daily = tk.history(period=f"{lookback_years}y", interval="1d", auto_adjust=False)
+        now = datetime.now()
+        daily = self._history(tk, ticker, "1d", now - timedelta(days=lookback_years*365))
         if daily.empty:
             raise ValueError(f"No daily data for {ticker}")
-        
-        daily = daily.reset_index()
-        # Robust Column Renaming
-        daily.columns = [str(c).lower() for c in daily.columns]
-        rename_map = {'date': 'timestamp', 'datetime': 'timestamp', 'index': 'timestamp'}
-        daily = daily.rename(columns=rename_map)
-        
-        if 'timestamp' in daily.columns:
-            daily['timestamp'] = pd.to_datetime(daily['timestamp']).dt.tz_localize(None)
 
         # 2. Intraday (for VWAP/0-7 DTE context)
-        intraday = tk.history(period="60d", interval="5m", auto_adjust=False)
-        if not intraday.empty:
-            intraday = intraday.reset_index()
-            # Robust Column Renaming for Intraday
-            intraday.columns = [str(c).lower() for c in intraday.columns]
-            intraday = intraday.rename(columns=rename_map)
-            
-            # Fallback: if still no timestamp, assume the first column is it
-            if 'timestamp' not in intraday.columns and not intraday.empty:
-                first_col = intraday.columns[0]
-                intraday = intraday.rename(columns={first_col: 'timestamp'})
-            
-            if 'timestamp' in intraday.columns:
-                intraday['timestamp'] = pd.to_datetime(intraday['timestamp']).dt.tz_localize(None)
+        intraday = self._history(tk, ticker, "5m", now - timedelta(days=59))
         
         # 3. Spot Price (Initial Guess)
         try:
@@ -47,44 +38,60 @@ class YahooProvider(DataProvider):
             spot = daily['close'].iloc[-1]
 
         # 4. Options Chain
-        expiries = tk.options
+        options, spot = self.fetch_options(ticker, spot)
+        return daily, intraday, options, spot
+
+    def fetch_options(self, ticker: str, spot: float):
+        """
+        Fetches option chains expiring within 45 days.
+        Returns: (options_df, spot) with spot synchronized to the chain quotes when available.
+        """
+        tk = _yf_ticker(ticker)
+        expiries = _yf_expiries(ticker)
         today = datetime.now()
         options_dfs = []
         
         latest_valid_spot = None # For synchronization logic
         
-        for exp_str in expiries:
-            exp_date = pd.to_datetime(exp_str)
-            dte = (exp_date - today).days
-            if 0 <= dte <= 45:
-                try:
-                    chain = tk.option_chain(exp_str)
-                    
-                    # --- Task 2: Synchronize Spot Price ---
-                    # Try to get the underlying price from the chain metadata to match the quotes
-                    if hasattr(chain, 'underlying') and chain.underlying:
-                        if 'regularMarketPrice' in chain.underlying:
-                            latest_valid_spot = chain.underlying['regularMarketPrice']
-                    # ---------------------------------------
-                    
-                    calls = chain.calls
-                    puts = chain.puts
+        # Chain requests are independent and I/O-bound: issue them concurrently
+        exp_index = pd.to_datetime(pd.Index(expiries, dtype=object))
+        dtes = (exp_index - pd.Timestamp(today)).days.to_numpy()
+        keep_exps = [(expiries[i], exp_index[i], int(dtes[i]))
+                     for i in np.flatnonzero((dtes >= 0) & (dtes <= 45))]
+        
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(tk.option_chain, exp_str) for exp_str, _, _ in keep_exps]
+        
+        # Results are consumed in expiry order, so the spot sync stays deterministic
+        for (exp_str, exp_date, dte), future in zip(keep_exps, futures):
+            try:
+                chain = future.result()
+                
+                # --- Task 2: Synchronize Spot Price ---
+                # Try to get the underlying price from the chain metadata to match the quotes
+                if hasattr(chain, 'underlying') and chain.underlying:
+                    if 'regularMarketPrice' in chain.underlying:
+                        latest_valid_spot = chain.underlying['regularMarketPrice']
+                # ---------------------------------------
+                
+                calls = chain.calls
+                puts = chain.puts
+                
+                if calls.empty and puts.empty:
+                    continue
                     
-                    if calls.empty and puts.empty:
+                # Tag both legs and defer all concatenation to a single pass
+                for frame, side in ((calls, 'call'), (puts, 'put')):
+                    if frame.empty:
                         continue
-                        
-                    calls['side'] = 'call'
-                    puts['side'] = 'put'
-                    
-                    df = pd.concat([calls, puts])
-                    df['expiration'] = exp_date
-                    df['dte'] = dte
-                    df['underlying_price'] = spot # Will update later if sync found
-                    
-                    options_dfs.append(df)
-                except Exception as e:
-                    # Silent skip for individual bad expiries
-                    continue
+                    frame['side'] = side
+                    frame['expiration'] = exp_date
+                    frame['dte'] = dte
+                    frame['underlying_price'] = spot # Will update later if sync found
+                    options_dfs.append(frame)
+            except Exception as e:
+                # Silent skip for individual bad expiries
+                continue
 
         if not options_dfs:
             options = pd.DataFrame()
@@ -97,4 +104,41 @@ class YahooProvider(DataProvider):
                 spot = latest_valid_spot
                 options['underlying_price'] = spot
         
-        return daily, intraday, options, spot
\ No newline at end of file
+        return options, spot
+
+    @classmethod
+    def _history(cls, tk, ticker, interval, start):
+        """Bars since start, served from the incremental cache where possible."""
+        cached, fetch_start = load_cached_bars(ticker, "yahoo", interval, start)
+        bars = cls._download(tk, fetch_start, interval)
+        
+        # Yahoo split-adjusts past closes retroactively (even with auto_adjust=False),
+        # so a split or a revised overlap bar invalidates everything cached
+        if cached is not None and (cls._split_since(bars, cached['timestamp'].max().normalize())
+                                   or bars_revised(cached, bars)):
+            print(f"  [Cache] {ticker} {interval} history was re-adjusted upstream. Refetching in full.")
+            cached, bars = None, cls._download(tk, start, interval)
+        return store_cached_bars(ticker, "yahoo", interval, start, cached, bars)
+
+    @staticmethod
+    def _split_since(bars, since):
+        """True if Yahoo reports a split on or after `since` in the fetched bars."""
+        if 'stock splits' not in bars:
+            return False
+        return bool((bars.loc[bars['timestamp'] >= since, 'stock splits'] != 0).any())
+
+    @staticmethod
+    def _download(tk, start, interval):
+        bars = tk.history(start=start, interval=interval, auto_adjust=False)
+        if not bars.empty:
+            bars = bars.reset_index()
+            # Robust Column Renaming
+            bars.columns = [str(c).lower() for c in bars.columns]
+            rename_map = {'date': 'timestamp', 'datetime': 'timestamp', 'index': 'timestamp'}
+            bars = bars.rename(columns=rename_map)
+            
+            # Fallback: if still no timestamp, assume the first column is it
+            if 'timestamp' not in bars.columns:
+                bars = bars.rename(columns={bars.columns[0]: 'timestamp'})
+            bars['timestamp'] = strip_tz(pd.to_datetime(bars['timestamp']))
+        return bars
\ No newline at end of file
@@ -1,24 +1,68 @@
 from arch import arch_model
 import numpy as np
 import pandas as pd
+from numba import njit, prange
 
 class GarchModel:
-    def __init__(self, returns):
+    def __init__(self, returns, rng=None):
         # returns: pd.Series of log returns
+        # rng: shared np.random.Generator used for all path simulations
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.returns = returns * 100 # Rescale for convergence
         self.model = arch_model(self.returns, vol='Garch', p=1, o=1, q=1, dist='t')
         self.res = self.model.fit(disp='off')
+        self.params = self.res.params
         
-    def simulate_paths(self, n_days, n_paths, current_price):
+        # Conditional state at the last observation (rolled forward by update)
+        self.last_sigma2 = np.asarray(self.res.conditional_volatility)[-1]**2
+        self.last_resid = np.asarray(self.res.resid)[-1]
+        
+    @classmethod
+    def from_array(cls, arr, rng=None):
+        """Fits directly on an ndarray of log returns, skipping the pandas path."""
+        return cls(np.ascontiguousarray(arr, dtype=np.float64), rng=rng)
+        
+    def update(self, new_returns):
+        """
+        Rolls the conditional variance forward over new_returns using the
+        frozen fit parameters, without re-estimating the model.
+        new_returns: log returns observed after the fit window (unscaled).
+        """
+        params = self.params
+        mu = params['mu']
+        omega = params['omega']
+        alpha = params['alpha[1]']
+        gamma = params['gamma[1]']
+        beta = params['beta[1]']
+        
+        sigma2 = self.last_sigma2
+        eps = self.last_resid
+        for r in np.asarray(new_returns, dtype=float) * 100:
+            sigma2 = omega + (alpha + gamma * (eps < 0)) * eps**2 + beta * sigma2
+            eps = r - mu
+            
+        self.last_sigma2 = sigma2
+        self.last_resid = eps
+        
+    @property
+    def sim_params(self):
+        """(omega, alpha, gamma, beta, nu) as used by the path simulators."""
+        params = self.params
+        return (params['omega'], params['alpha[1]'], params['gamma[1]'],
+                params['beta[1]'], params['nu'])
+        
+    def simulate_paths(self, n_days, n_paths, current_price, terminal_only=False):
         """
         Simulates future price paths.
         Returns: (n_paths, n_days+1) array of prices.
+        With terminal_only=True, returns only the (n_paths,) terminal prices
+        (and the same final per-path vol) without materialising the price grid.
         """
         # Forecast variance
         # GJR-GARCH simulation logic:
         # sigma_t^2 = omega + alpha*e_{t-1}^2 + gamma*e_{t-1}^2*I + beta*sigma_{t-1}^2
         
-        params = self.res.params
+        params = self.params
         omega = params['omega']
         alpha = params['alpha[1]']
         gamma = params['gamma[1]']
@@ -26,48 +70,98 @@ class GarchModel:
         nu = params['nu'] # Student-t df
         
         # Last known volatility
-        last_vol = self.res.conditional_volatility.iloc[-1]
+        last_vol = np.sqrt(self.last_sigma2)
         
-        # Generate innovations (Student-t)
+        # Generate innovations (Student-t) up front
         # Shape: (n_paths, n_days)
-        z = np.random.standard_t(nu, size=(n_paths, n_days))
-        
-        log_ret = np.zeros((n_paths, n_days))
-        vol_sq = np.zeros((n_paths, n_days))
+        z = standard_t(self.rng, nu, (n_paths, n_days))
         
-        # Step 0
-        # We need e_0 (last residual). Approx as 0 for simplicity or use last model resid
-        h_t = last_vol**2
+        if terminal_only:
+            terminal = np.empty(n_paths, dtype=np.float32)
+            final_vol_sq = np.empty(n_paths, dtype=np.float32)
+            _simulate_terminal(np.float32(omega), np.float32(alpha), np.float32(gamma), np.float32(beta),
+                               np.float32(last_vol**2), np.float32(current_price), z, terminal, final_vol_sq)
+            return terminal, np.sqrt(final_vol_sq)/100.0
         
-        current_vol_sq = np.full(n_paths, h_t)
+        # Paths are stored in float32: percentiles don't need double precision
+        # and it halves the memory traffic of the price grid
+        prices = np.empty((n_paths, n_days + 1), dtype=np.float32)
+        final_vol_sq = np.empty(n_paths, dtype=np.float32)
+        _simulate(np.float32(omega), np.float32(alpha), np.float32(gamma), np.float32(beta),
+                  np.float32(last_vol**2), np.float32(current_price), z, prices, final_vol_sq)
         
+        # Also return average volatility path (for Bridge)
+        # simplified: return constant last vol for bridge approximation
+        return prices, np.sqrt(final_vol_sq)/100.0
+
+def standard_t(rng, nu, size):
+    """
+    Student-t draws in float32 from a np.random.Generator, built as
+    normal / sqrt(chi2 / nu) since Generator.standard_t has no dtype option.
+    nu may be a scalar or an array broadcastable to size.
+    """
+    nu = np.asarray(nu, dtype=np.float32)
+    z = rng.standard_normal(size, dtype=np.float32)
+    chi2_nu = rng.standard_gamma(nu / 2, size, dtype=np.float32)
+    chi2_nu *= 2 / nu
+    np.sqrt(chi2_nu, out=chi2_nu)
+    z /= chi2_nu
+    return z
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _simulate(omega, alpha, gamma, beta, sigma2_0, S0, z, out, out_vol_sq):
+    """
+    Path kernel for simulate_paths. Consumes innovations z (n_paths, n_days)
+    and fills out (n_paths, n_days+1) with prices and out_vol_sq (n_paths,)
+    with the final conditional variance.
+    """
+    n_paths, n_days = z.shape
+    for i in prange(n_paths):
+        vol_sq = sigma2_0
+        cum_ret = 0.0
+        out[i, 0] = S0
         for t in range(n_days):
             # epsilon = z * sigma
-            eps = z[:, t] * np.sqrt(current_vol_sq)
+            eps = z[i, t] * np.sqrt(vol_sq)
             
             # Record returns (divide by 100 because we scaled up)
-            log_ret[:, t] = eps / 100.0
+            cum_ret += eps / 100.0
             
-            # Update variance for next step
-            # I indicator
-            I = (eps < 0).astype(float)
-            next_vol_sq = omega + (alpha + gamma * I) * (eps**2) + beta * current_vol_sq
-            # --- FIX: Clamp Variance to avoid overflow ---
-            # Cap volatility at 500% daily (insanely high, but prevents infinity)
-            # 500% daily variance approx 25.0 (since returns are scaled by 100, variance is scaled by 10000)
-            # A daily return of 20% is variance 400. Let's cap at 10,000 (100% daily move).
-            current_vol_sq = np.minimum(next_vol_sq, 10000.0)
+            # --- FIX: Clamp Price to prevent overflow in long-dated simulations ---
+            out[i, t + 1] = min(S0 * np.exp(cum_ret), S0 * 5.0)
             
-        # Cumsum to get prices
-        cum_ret = np.cumsum(log_ret, axis=1)
-        prices = current_price * np.exp(cum_ret)
-        
-        # --- FIX: Clamp Price to prevent overflow in long-dated simulations ---
-        prices = np.minimum(prices, current_price * 5.0)
-        
-        # Prepend current price
-        prices = np.hstack([np.full((n_paths, 1), current_price), prices])
-        
-        # Also return average volatility path (for Bridge)
-        # simplified: return constant last vol for bridge approximation
-        return prices, np.sqrt(current_vol_sq)/100.0
\ No newline at end of file
+            # Update variance for next step (I indicator on negative shocks)
+            next_vol_sq = omega + (alpha + (gamma if eps < 0 else 0.0)) * eps * eps + beta * vol_sq
+            # --- FIX: Clamp Variance to avoid overflow ---
+            # A daily return of 20% is variance 400. Cap at 10,000 (100% daily move).
+            vol_sq = min(next_vol_sq, 10000.0)
+        out_vol_sq[i] = vol_sq
+
+@njit(fastmath=True, cache=True)
+def _evolve(omega, alpha, gamma, beta, sigma2_0, S0, z):
+    """(terminal price, final conditional variance) of one path driven by z (n_days,)."""
+    vol_sq = sigma2_0
+    cum_ret = 0.0
+    for t in range(z.shape[0]):
+        eps = z[t] * np.sqrt(vol_sq)
+        cum_ret += eps / 100.0
+        next_vol_sq = omega + (alpha + (gamma if eps < 0 else 0.0)) * eps * eps + beta * vol_sq
+        vol_sq = min(next_vol_sq, 10000.0)
+    return min(S0 * np.exp(cum_ret), S0 * 5.0), vol_sq
+
+@njit(fastmath=True, cache=True)
+def evolve_terminal(omega, alpha, gamma, beta, sigma2_0, S0, z):
+    """
+    Terminal price of a single path driven by innovations z (n_days,), with
+    the same dynamics and clamps as simulate_paths. Callable from other kernels.
+    """
+    return _evolve(omega, alpha, gamma, beta, sigma2_0, S0, z)[0]
+
+@njit(parallel=True, cache=True)
+def _simulate_terminal(omega, alpha, gamma, beta, sigma2_0, S0, z, out, out_vol_sq):
+    """
+    Terminal-only path kernel for simulate_paths: fills out (n_paths,) with
+    terminal prices and out_vol_sq (n_paths,) with the final conditional variance.
+    """
+    for i in prange(z.shape[0]):
+        out[i], out_vol_sq[i] = _evolve(omega, alpha, gamma, beta, sigma2_0, S0, z[i])
\ No newline at end of file
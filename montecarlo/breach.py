@@ -1,68 +1,80 @@
+import math
 import numpy as np
-from numba import jit
+from numba import njit, prange
 
-@jit(nopython=True)
-def brownian_bridge_touch(S_start, S_end, Barrier, sigma, dt):
+# Fixed chunk count keeps the per-strike summation order independent of the thread count
+_N_CHUNKS = 64
+
+# fastmath without the no-NaN/no-Inf flags: the max scans start from -inf
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def _bridge_loop(prices, strikes, T_years, vol_annual):
     """
-    Probability of touching Barrier in (0, dt) given start and end,
-    assuming GBM locally.
+    Touch probability per strike: 1 if the discrete path max reaches K,
+    otherwise the Brownian bridge probability of touching K between the
+    path start and end, assuming GBM locally:
+        P(hit) = exp(-2 * (b - x0) * (b - xT) / (sigma^2 * T)) in log prices.
+    Path max scan and bridge term are fused into one pass per path.
     """
-    if S_start >= Barrier or S_end >= Barrier:
-        return 1.0
-        
-    # Standard Bridge Formula
-    # P(hit) = exp( -2 * (B - S_0)*(B - S_T) / (sigma^2 * T) )
-    # Note: working with Prices directly (approx) or Logs.
-    # Logs is more accurate for GBM:
-    x0 = np.log(S_start)
-    xT = np.log(S_end)
-    b = np.log(Barrier)
-    
-    if sigma < 1e-9: return 0.0
-    
-    arg = -2 * (b - x0) * (b - xT) / (sigma**2 * dt)
-    return np.exp(arg)
-
-@jit(nopython=True)
-def _bridge_loop(prices, strike, T_years, vol_annual):
     n_paths = prices.shape[0]
-    total_touch_prob = 0.0
+    n_steps = prices.shape[1]
+    n_strikes = strikes.shape[0]
     
-    for i in range(n_paths):
-        # 1. Discrete check (Max of path)
-        path_max = -np.inf
-        for p in prices[i]:
-            if p > path_max:
-                path_max = p
-        
-        if path_max >= strike:
-            total_touch_prob += 1.0
-        else:
-            # 2. Bridge check (Conditional probability)
-            # using start and end of the full path
-            s_start = prices[i, 0]
-            s_end = prices[i, -1]
-            
-            # vol is annualized, dt is T_years
-            prob = brownian_bridge_touch(s_start, s_end, strike, vol_annual, T_years)
-            total_touch_prob += prob
+    log_strikes = np.empty(n_strikes)
+    k_max = -np.inf
+    for j in range(n_strikes):
+        log_strikes[j] = math.log(strikes[j])
+        k_max = max(k_max, strikes[j])
+    use_bridge = vol_annual >= 1e-9
+    inv_var_t = 1.0 / (vol_annual * vol_annual * T_years) if use_bridge else 0.0
+    
+    n_chunks = min(_N_CHUNKS, n_paths)
+    partial = np.zeros((n_chunks, n_strikes))
+    for c in prange(n_chunks):
+        lo = c * n_paths // n_chunks
+        hi = (c + 1) * n_paths // n_chunks
+        acc = partial[c]
+        for i in range(lo, hi):
+            # Discrete check (max of path); stop once every strike is breached
+            path_max = -np.inf
+            for t in range(n_steps):
+                p = prices[i, t]
+                if p > path_max:
+                    path_max = p
+                    if path_max >= k_max:
+                        break
             
+            # Bridge over the full path, from its start to its end
+            x0 = math.log(prices[i, 0])
+            xT = math.log(prices[i, n_steps - 1])
+            for j in range(n_strikes):
+                if path_max >= strikes[j]:
+                    acc[j] += 1.0
+                elif use_bridge:
+                    b = log_strikes[j]
+                    acc[j] += math.exp(-2.0 * (b - x0) * (b - xT) * inv_var_t)
+    
+    total_touch_prob = np.zeros(n_strikes)
+    for c in range(n_chunks):
+        for j in range(n_strikes):
+            total_touch_prob[j] += partial[c, j]
     return total_touch_prob / n_paths
 
-def calculate_probabilities(prices, strike, T_years, vol_daily):
+def calculate_probabilities(prices, strikes, T_years, vol_daily):
     """
     prices: (n_paths, n_steps + 1)
-    strike: float
+    strikes: array of K (evaluated in one pass over prices)
     T_years: float
     vol_daily: scalar volatility (daily)
+    Returns: (p_otm, se_otm, p_touch) arrays aligned with strikes.
     """
+    strikes = np.atleast_1d(np.asarray(strikes, dtype=np.float64))
     n_paths, n_steps = prices.shape
     
-    # 1. Terminal Breach (Expires ITM)
-    final_prices = prices[:, -1]
-    is_itm = final_prices > strike
-    p_itm = np.mean(is_itm)
-    p_otm = 1.0 - p_itm
+    # 1. Terminal Breach (Expires ITM): P(S_T <= K) via the sorted terminal prices
+    final_prices = np.sort(prices[:, -1])
+    p_otm = np.searchsorted(final_prices, strikes, side='right') / n_paths
     
     # 2. Standard Error for P_OTM
     se_otm = np.sqrt(p_otm * (1 - p_otm) / n_paths)
@@ -71,6 +83,6 @@ def calculate_probabilities(prices, strike, T_years, vol_daily):
     # Convert daily vol to annual for the bridge formula (assuming T_years is annual)
     vol_annual = vol_daily * np.sqrt(365.0)
     
-    p_touch = _bridge_loop(prices, float(strike), float(T_years), float(vol_annual))
+    p_touch = _bridge_loop(prices, strikes, float(T_years), float(vol_annual))
     
     return p_otm, se_otm, p_touch
@@ -1,142 +1,241 @@
+import logging
+from collections import Counter
+from typing import Union
 import numpy as np
 import pandas as pd
 from ..options.iv_surface import get_iv_from_surface
-from ..options.greeks import calculate_delta
+from ..options.greeks import calculate_delta_vec
+
+logger = logging.getLogger(__name__)
+
+# Only these chain columns are read; everything else is dropped at the boundary
+_CALL_COLUMNS = [
+    'strike', 'expiration', 'bid', 'ask', 'mid', 'spread', 'rel_spread',
+    'openInterest', 'impliedVolatility', 'dte', 'underlying_price',
+]
+
+def _apply_checks(checks, strikes, keep, rejections, debug):
+    """Apply (label, reject_mask, values, reason) checks in order; each row is
+    counted against the first one it fails. Returns the narrowed keep mask."""
+    for label, reject, values, reason in checks:
+        reject = reject & keep
+        rejections[label] += int(reject.sum())
+        if debug:
+            for K, v in zip(strikes[reject], values[reject]):
+                logger.debug(f"Strike {K}: REJECTED ({reason(v)})")
+        keep = keep & ~reject
+    return keep
+
+def _log_summary(n_accepted, n_calls, rejections, n_skipped=0):
+    # Bound-skipped strikes passed every check but were never priced, so they
+    # are reported apart from both the accepted and the rejected counts
+    logger.info(
+        "  Strike filter: %d of %d calls accepted (rejected: %s; skipped (bound): %d)",
+        n_accepted, n_calls,
+        ", ".join(f"{label} {n}" for label, n in (+rejections).items()) or "none",
+        n_skipped,
+    )
 
 def select_strike(
     df_opts: pd.DataFrame, 
-    p_otm_dict: dict, 
+    p_otm_dict: Union[dict, pd.DataFrame], 
     resistance_df: pd.DataFrame, 
     config,
     svi_params=None
 ):
     if df_opts.empty: return None
 
-    # Filter to Calls
-    calls = df_opts[df_opts['side'] == 'call'].copy()
-    candidates = []
+    # Filter to Calls, projecting to the used columns in the same take. The take
+    # already yields a new frame and calls is only read, so no defensive copy
+    calls = df_opts.loc[df_opts['side'].to_numpy() == 'call', _CALL_COLUMNS]
     spot = calls['underlying_price'].iloc[0]
     
-    # Get Immediate Resistance
-    res_candidates = resistance_df[resistance_df['level'] > spot]
-    if res_candidates.empty:
+    # Preload every column once; all filtering below is array indexing
+    strike_a = calls['strike'].to_numpy()
+    exp_a = calls['expiration'].array
+    bid_a = calls['bid'].to_numpy()
+    ask_a = calls['ask'].to_numpy()
+    mid_a = calls['mid'].to_numpy()
+    spread_a = calls['spread'].to_numpy()
+    rel_a = calls['rel_spread'].fillna(0.0).to_numpy()
+    oi_a = calls['openInterest'].fillna(0).to_numpy()
+    iv_a = calls['impliedVolatility'].to_numpy()
+    dte_a = np.maximum(calls['dte'].to_numpy(), 1)
+    
+    # Get Immediate Resistance: binary search over the level-sorted zones
+    # (detect_resistance already sorts; anything else is sorted here)
+    if not resistance_df['level'].is_monotonic_increasing:
+        resistance_df = resistance_df.sort_values('level', kind='stable')
+    levels = resistance_df['level'].to_numpy()
+    idx = np.searchsorted(levels, spot, side='right')
+    if idx == len(levels):
         res_level = spot * 1.10
         res_strength = 1.0
     else:
-        res_level = res_candidates.iloc[0]['level']
-        res_strength = res_candidates.iloc[0]['strength']
+        res_level = levels[idx]
+        res_strength = resistance_df['strength'].iat[idx]
 
-    print(f"\n--- DEBUG: Analyzing {len(calls)} Calls for Expiry {calls.iloc[0]['expiration']} ---")
-    print(f"Spot: {spot:.2f} | Resistance: {res_level:.2f}")
-
-    for idx, row in calls.iterrows():
-        K = row['strike']
-        if K <= spot: continue
-        
-        # --- Task 2: Liquidity Filter ---
-        oi = row.get('openInterest', 0)
-        if pd.isna(oi): oi = 0
-        if oi < config.min_oi:
-            print(f"Strike {K}: REJECTED (Low OI: {oi} < {config.min_oi})")
-            continue
-        
-        # --- Task 3: Zombie & Spread Filter ---
-        if row['bid'] < 0.05:
-            print(f"Strike {K}: REJECTED (Zombie Quote: Bid {row['bid']:.2f})")
-            continue
-            
-        if row['bid'] > 0:
-            spread_pct = (row['ask'] - row['bid']) / row['bid']
-            if spread_pct > 0.5:
-                print(f"Strike {K}: REJECTED (Wide Spread: {spread_pct:.1%})")
-                continue
-        
-        # --- Task 4: Transaction Costs & Net Premium ---
-        # Calculate Effective Price first
-        bid = row['bid']
-        ask = row['ask']
-        mid = row['mid']
-        spread = row['spread']
-        rel_spread = row['rel_spread'] if not pd.isna(row['rel_spread']) else 0.0
-        
-        if rel_spread < config.liquidity_spread_thresh:
-            effective_price = mid
-        else:
-            effective_price = bid + (config.liquidity_crossing_factor * spread)
-            
-        # Commission Logic (Interactive Brokers)
-        gross_premium = effective_price * 100
-        net_premium = gross_premium - config.commission_fee
-        
-        if net_premium < config.min_premium_abs:
-            print(f"Strike {K}: REJECTED (Net Premium ${net_premium:.2f} < ${config.min_premium_abs})")
-            continue
-            
-        # Re-calculate yield based on Net Premium (per share basis)
-        net_price_per_share = net_premium / 100.0
-        dte = max(row['dte'], 1)
-        yld = (net_price_per_share / spot) * (365 / dte)
+    # Per-strike diagnostics are only formatted when DEBUG logging is on
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug(f"\n--- DEBUG: Analyzing {len(calls)} Calls for Expiry {exp_a[0]} ---")
+        logger.debug(f"Spot: {spot:.2f} | Resistance: {res_level:.2f}")
+    n_calls = len(calls)
+    rejections = Counter()
 
-        # Get Probabilities
-        if K not in p_otm_dict: 
-            print(f"Strike {K}: REJECTED (No Prob Data)")
-            continue
-        p_otm, p_lcb, p_touch = p_otm_dict[K]
-        
+    # --- Vectorized filter stage: cheap column predicates before any per-row work ---
+    # Strike/OI/bid gates first: most of a chain is ITM or illiquid, and if
+    # nothing survives there is no join or pricing work to do at all
+    keep = strike_a > spot
+    rejections['ITM'] = int(n_calls - keep.sum())
+    # --- Task 2: Liquidity & Zombie Filter ---
+    keep = _apply_checks([
+        ('Low OI', oi_a < config.min_oi, oi_a, lambda v: f"Low OI: {v} < {config.min_oi}"),
+        ('Zombie Quote', bid_a < 0.05, bid_a, lambda v: f"Zombie Quote: Bid {v:.2f}"),
+    ], strike_a, keep, rejections, debug)
+    rows = np.flatnonzero(keep)
+    if not rows.size:
+        _log_summary(0, n_calls, rejections)
+        return None
+    strikes, bid = strike_a[rows], bid_a[rows]
+    
+    # Attach probabilities by strike lookup; strikes without data get NaN and are rejected below
+    p_cols = ['p_otm', 'p_lcb', 'p_touch']
+    # Callers can pass the frame (strike + p_cols) directly and skip the dict round-trip
+    if isinstance(p_otm_dict, pd.DataFrame):
+        p_df = p_otm_dict[['strike', *p_cols]]
+    else:
+        p_df = pd.DataFrame([(k, *v) for k, v in p_otm_dict.items()], columns=['strike', *p_cols])
+    if p_df.empty:
+        p_otm = p_lcb = p_touch = np.full(len(strikes), np.nan)
+    else:
+        pos = pd.Index(p_df['strike']).get_indexer(strikes)
+        found = pos >= 0
+        p_otm, p_lcb, p_touch = (
+            np.where(found, p_df[c].to_numpy(dtype=np.float64)[pos], np.nan) for c in p_cols
+        )
+    
+    # --- Task 3: Spread Filter ---
+    # Zombie quotes (bid < 0.05) are already gone, so the division needs no guard
+    spread_pct = (ask_a[rows] - bid) / bid
+    
+    # --- Task 4: Transaction Costs & Net Premium ---
+    # Calculate Effective Price first
+    effective_price = np.where(
+        rel_a[rows] < config.liquidity_spread_thresh,
+        mid_a[rows],
+        bid + config.liquidity_crossing_factor * spread_a[rows]
+    )
+    
+    # Commission Logic (Interactive Brokers)
+    net_premium = effective_price * 100 - config.commission_fee
+    
+    # Re-calculate yield based on Net Premium (per share basis)
+    yld = (net_premium / 100.0 / spot) * (365 / dte_a[rows])
+    
+    # Checks run in order; each row is reported against the first one it fails
+    checks = [
+        ('Wide Spread', spread_pct > 0.5, spread_pct, lambda v: f"Wide Spread: {v:.1%}"),
+        ('Net Premium', net_premium < config.min_premium_abs, net_premium, lambda v: f"Net Premium ${v:.2f} < ${config.min_premium_abs}"),
+        ('No Prob Data', np.isnan(p_lcb), p_lcb, lambda v: "No Prob Data"),
         # Constraints
-        if p_lcb < config.p_target_min:
-            print(f"Strike {K}: REJECTED (Unsafe: LCB {p_lcb:.2%} < {config.p_target_min:.1%})")
-            continue
-            
-        if config.touch_cap and p_touch > config.touch_cap:
-            print(f"Strike {K}: REJECTED (Touch Risk: {p_touch:.2%} > {config.touch_cap:.1%})")
-            continue
-            
-        # Model IV & Delta
-        T_years = max(row['dte'], 1) / 365.0
+        ('Unsafe', p_lcb < config.p_target_min, p_lcb, lambda v: f"Unsafe: LCB {v:.2%} < {config.p_target_min:.1%}"),
+    ]
+    if config.touch_cap:
+        checks.append(('Touch Risk', p_touch > config.touch_cap, p_touch, lambda v: f"Touch Risk: {v:.2%} > {config.touch_cap:.1%}"))
+    
+    keep = _apply_checks(checks, strikes, np.ones(rows.size, dtype=bool), rejections, debug)
+    
+    rows = rows[keep]
+    strikes = strikes[keep]
+    effective_price, net_premium, yld = effective_price[keep], net_premium[keep], yld[keep]
+    p_otm, p_lcb, p_touch = p_otm[keep], p_lcb[keep], p_touch[keep]
+    
+    # score = yld - lambda_res * dist_res / spot - lambda_risk * delta. Delta is
+    # the only costly term and is >= 0, so bound = score + lambda_risk * delta
+    # caps what each strike can reach before any IV/delta lookup.
+    dist_res = np.abs(strikes - res_level)
+    bound = dist_res / spot
+    bound *= -config.lambda_res
+    bound += yld
+    
+    # Model IV & Delta, batched over the strikes that still matter
+    T_years = dte_a[rows] / 365.0
+    model_iv = np.full(len(strikes), np.nan)
+    delta = np.full(len(strikes), np.nan)
+    evaluated = np.zeros(len(strikes), dtype=bool)
+    
+    def evaluate(idx):
         if svi_params is not None:
-            model_iv = get_iv_from_surface(K, T_years, spot, svi_params)
+            model_iv[idx] = get_iv_from_surface(strikes[idx], T_years[idx], spot, svi_params)
         else:
-            model_iv = row['impliedVolatility']
-            
-        delta = calculate_delta(spot, K, T_years, risk_free=0.04, vol=model_iv)
-        
-        if delta > config.max_delta:
-            print(f"Strike {K}: REJECTED (High Delta: {delta:.2f} > {config.max_delta})")
-            continue
-            
-        dist_res = abs(K - res_level)
-        
-        score = yld \
-                - config.lambda_res * (dist_res / spot) \
-                - config.lambda_risk * delta
-        
-        print(f"Strike {K}: ACCEPTED (Score: {score:.4f}, Prob: {p_lcb:.1%}, Net: ${net_premium:.2f})")
-
-        candidates.append({
-            'strike': K,
-            'expiration': row['expiration'],
-            'type': 'call',
-            'bid': bid,
-            'ask': ask,
-            'mid': mid,
-            'effective_price': effective_price,
-            'net_premium': net_premium,  # Store net
-            'p_otm': p_otm,
-            'p_lcb': p_lcb,
-            'p_touch': p_touch,
-            'model_iv': model_iv,
-            'delta': delta,
-            'resistance': res_level,
-            'res_strength': res_strength,
-            'dist_res': dist_res,
-            'yield': yld,
-            'score': score
-        })
+            model_iv[idx] = iv_a[rows[idx]]
+        delta[idx] = calculate_delta_vec(spot, strikes[idx], T_years[idx], risk_free=0.04, vols=model_iv[idx])
+        evaluated[idx] = True
+    
+    # Price the (yield, dist_res) Pareto front first: its best feasible score is
+    # a floor the optimum must reach, so strikes whose bound falls below it are
+    # dominated and skipped. The final pick is the same as scoring every strike.
+    order = np.lexsort((dist_res, -yld))
+    d_sorted = dist_res[order]
+    prev_min = np.minimum.accumulate(np.concatenate(([np.inf], d_sorted[:-1])))
+    evaluate(order[d_sorted < prev_min])
+    
+    floor = -np.inf
+    if config.lambda_risk >= 0:
+        front_ok = evaluated & (delta <= config.max_delta)
+        if front_ok.any():
+            floor = (bound[front_ok] - config.lambda_risk * delta[front_ok]).max()
+    evaluate(np.flatnonzero(~evaluated & ~(bound < floor)))
+    skipped = ~evaluated
+    if debug:
+        for K, ub in zip(strikes[skipped], bound[skipped]):
+            logger.debug(f"Strike {K}: SKIPPED (score bound {ub:.4f} < best {floor:.4f})")
+    
+    high_delta = evaluated & (delta > config.max_delta)
+    rejections['High Delta'] += int(high_delta.sum())
+    if debug:
+        for K, d in zip(strikes[high_delta], delta[high_delta]):
+            logger.debug(f"Strike {K}: REJECTED (High Delta: {d:.2f} > {config.max_delta})")
+    
+    score = bound - config.lambda_risk * delta
+    # A missing IV leaves delta (and so the score) NaN; such strikes cannot be
+    # ranked and must never win the argmax below
+    no_score = evaluated & ~high_delta & ~np.isfinite(score)
+    rejections['No Score'] += int(no_score.sum())
+    if debug:
+        for K in strikes[no_score]:
+            logger.debug(f"Strike {K}: REJECTED (No Score: model IV/delta unavailable)")
+    
+    accepted = evaluated & ~high_delta & ~no_score
+    if debug:
+        for K, sc, pl, net in zip(strikes[accepted], score[accepted], p_lcb[accepted], net_premium[accepted]):
+            logger.debug(f"Strike {K}: ACCEPTED (Score: {sc:.4f}, Prob: {pl:.1%}, Net: ${net:.2f})")
         
-    if not candidates:
+    n_accepted = int(accepted.sum())
+    _log_summary(n_accepted, n_calls, rejections, int(skipped.sum()))
+    if not n_accepted:
         return None
         
-    df_cand = pd.DataFrame(candidates)
-    best = df_cand.sort_values('score', ascending=False).iloc[0]
-    return best.to_dict()
\ No newline at end of file
+    j = int(np.argmax(np.where(accepted, score, -np.inf)))
+    r = rows[j]
+    return {
+        'strike': strikes[j],
+        'expiration': exp_a[r],
+        'type': 'call',
+        'bid': bid_a[r],
+        'ask': ask_a[r],
+        'mid': mid_a[r],
+        'effective_price': effective_price[j],
+        'net_premium': net_premium[j],  # Store net
+        'p_otm': p_otm[j],
+        'p_lcb': p_lcb[j],
+        'p_touch': p_touch[j],
+        'model_iv': model_iv[j],
+        'delta': delta[j],
+        'resistance': res_level,
+        'res_strength': res_strength,
+        'dist_res': dist_res[j],
+        'yield': yld[j],
+        'score': score[j]
+    }
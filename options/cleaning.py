@@ -6,63 +6,60 @@ def clean_options(df: pd.DataFrame, min_oi=10, min_mid=0.05):
     Computes mid, spread, cleans crossed quotes.
     Includes fallback to 'lastPrice' if Bid/Ask are zero (common with Yahoo).
     """
-    df = df.copy()
-    
+    # Work on NumPy arrays; the caller's frame is left untouched and only
+    # the surviving rows are materialized
     # 1. Handle NaNs from data feed
-    df['openInterest'] = df['openInterest'].fillna(0)
-    df['bid'] = df['bid'].fillna(0)
-    df['ask'] = df['ask'].fillna(0)
+    oi = df['openInterest'].fillna(0).to_numpy()
+    bid = df['bid'].fillna(0).to_numpy()
+    ask = df['ask'].fillna(0).to_numpy()
     if 'lastPrice' not in df.columns:
-        df['lastPrice'] = 0.0
+        last = np.zeros(len(df))
     else:
-        df['lastPrice'] = df['lastPrice'].fillna(0)
+        last = df['lastPrice'].fillna(0).to_numpy()
     
     # 2. Fallback Logic: Use LastPrice if Quotes are Missing
     # Check for rows where Bid & Ask are 0 but LastPrice exists
-    missing_quotes = (df['bid'] <= 0) & (df['ask'] <= 0) & (df['lastPrice'] > 0)
+    missing_quotes = (bid <= 0) & (ask <= 0) & (last > 0)
     num_fallback = missing_quotes.sum()
     
     if num_fallback > 0:
         # Force Bid/Ask to match LastPrice so we can run analysis
         print(f"    [DATA FIX] Using 'lastPrice' for {num_fallback} contracts with missing quotes.")
-        df.loc[missing_quotes, 'bid'] = df.loc[missing_quotes, 'lastPrice']
-        df.loc[missing_quotes, 'ask'] = df.loc[missing_quotes, 'lastPrice']
+        bid = np.where(missing_quotes, last, bid)
+        ask = np.where(missing_quotes, last, ask)
         # Set spread to 0 for these implied quotes
     
     # 3. Compute Mid
-    df['mid'] = (df['bid'] + df['ask']) / 2
-    df['spread'] = df['ask'] - df['bid']
-    df['rel_spread'] = np.where(df['mid'] > 0, df['spread'] / df['mid'], 0.0)
+    mid = (bid + ask) / 2
+    spread = ask - bid
     
-    # 4. Define Filters
-    mask_bid_exists = (df['bid'] > 0)
-    mask_ask_exists = (df['ask'] > 0) # Should be covered by fallback
-    mask_not_crossed = (df['bid'] <= df['ask'])
-    mask_min_mid = (df['mid'] >= min_mid)
-    mask_min_oi = (df['openInterest'] >= min_oi)
+    # 4. Filters, fused into one mask: bid/ask exist, not crossed, min mid, min OI
+    # (per-filter masks are only rebuilt for the diagnostic report)
+    mask = (bid > 0) & (ask > 0) & (bid <= ask) & (mid >= min_mid) & (oi >= min_oi)
     
-    # Combined mask
-    mask = (
-        mask_bid_exists & 
-        mask_ask_exists & 
-        mask_not_crossed & 
-        mask_min_mid & 
-        mask_min_oi
+    # Survivors have bid, ask > 0, so mid > 0 and rel_spread needs no guard
+    kept_mid, kept_spread = mid[mask], spread[mask]
+    cleaned = df[mask].reset_index(drop=True).assign(
+        openInterest=oi[mask],
+        bid=bid[mask],
+        ask=ask[mask],
+        lastPrice=last[mask],
+        mid=kept_mid,
+        spread=kept_spread,
+        rel_spread=kept_spread / kept_mid,
     )
     
-    cleaned = df[mask].reset_index(drop=True)
-    
     # --- DIAGNOSTICS ---
     if cleaned.empty and not df.empty:
         print(f"    >>> DIAGNOSTIC REPORT ({len(df)} Raw Contracts) <<<")
-        print(f"    - Zero Bid:       {len(df) - mask_bid_exists.sum()} rejected")
-        print(f"    - Zero Ask:       {len(df) - mask_ask_exists.sum()} rejected")
-        print(f"    - Low Price:      {len(df) - mask_min_mid.sum()} rejected (< ${min_mid})")
-        print(f"    - Low Liquidity:  {len(df) - mask_min_oi.sum()} rejected (< {min_oi} OI)")
+        print(f"    - Zero Bid:       {(bid <= 0).sum()} rejected")
+        print(f"    - Zero Ask:       {(ask <= 0).sum()} rejected")
+        print(f"    - Low Price:      {len(df) - (mid >= min_mid).sum()} rejected (< ${min_mid})")
+        print(f"    - Low Liquidity:  {len(df) - (oi >= min_oi).sum()} rejected (< {min_oi} OI)")
         
         print(f"    - SAMPLE RAW DATA (First 1 row):")
-        cols = ['strike', 'bid', 'ask', 'lastPrice', 'openInterest']
-        print(df[cols].iloc[0].to_dict())
+        sample = {'strike': df['strike'].iloc[0], 'bid': bid[0], 'ask': ask[0], 'lastPrice': last[0], 'openInterest': oi[0]}
+        print(pd.Series(sample).to_dict())
         print("    " + "-"*40)
         
     return cleaned
\ No newline at end of file
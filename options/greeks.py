@@ -1,5 +1,9 @@
 import numpy as np
-from scipy.stats import norm
+from math import erf, log, sqrt
+from numba import njit, prange
+
+# fastmath without the no-NaN/no-Inf flags: a missing IV must stay NaN, as before
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
 
 def calculate_delta(spot, strike, time_to_maturity, risk_free=0.04, vol=0.5):
     """
@@ -11,6 +15,33 @@ def calculate_delta(spot, strike, time_to_maturity, risk_free=0.04, vol=0.5):
     if vol <= 0:
         return 1.0 if spot > strike else 0.0
         
-    d1 = (np.log(spot / strike) + (risk_free + 0.5 * vol**2) * time_to_maturity) / (vol * np.sqrt(time_to_maturity))
+    d1 = (log(spot / strike) + (risk_free + 0.5 * vol**2) * time_to_maturity) / (vol * sqrt(time_to_maturity))
     
-    return float(norm.cdf(d1))
+    # Scalar normal CDF via erf
+    return 0.5 * (1.0 + erf(d1 / 1.4142135623730951))
+
+@njit(parallel=True, fastmath=_FASTMATH, cache=True)
+def delta_batch(spot, K, T, r, v, out):
+    """calculate_delta over arrays of strikes, maturities and vols, written into out."""
+    for i in prange(K.size):
+        if T[i] <= 0:
+            out[i] = 0.0
+        elif v[i] <= 0:
+            out[i] = 1.0 if spot > K[i] else 0.0
+        else:
+            d1 = (log(spot / K[i]) + (r + 0.5 * v[i] * v[i]) * T[i]) / (v[i] * sqrt(T[i]))
+            out[i] = 0.5 * (1.0 + erf(d1 / 1.4142135623730951))
+    return out
+
+def calculate_delta_vec(spot, strikes, time_to_maturity, risk_free=0.04, vols=0.5, out=None):
+    """
+    Vectorized calculate_delta via the parallel delta_batch kernel over arrays
+    of strikes and vols (time_to_maturity may be a scalar or an array of the
+    same shape). Pass a float64 `out` of matching size to reuse a buffer.
+    """
+    strikes = np.ravel(np.asarray(strikes, dtype=np.float64))
+    vols = np.full(strikes.shape, vols, dtype=np.float64)
+    T = np.full(strikes.shape, time_to_maturity, dtype=np.float64)
+    if out is None:
+        out = np.empty(strikes.shape)
+    return delta_batch(float(spot), strikes, T, float(risk_free), vols, out)
@@ -1,10 +1,31 @@
+import math
 import numpy as np
+from numba import njit
 from scipy.optimize import least_squares
 
+# Explicit signatures compile (or load from cache) at import, so least_squares
+# never pays JIT cost inside the fit
+@njit("f8[:](f8[:], f8, f8, f8, f8, f8)", cache=True, fastmath=True)
 def svi_raw(k, a, b, rho, m, sigma):
     # k = log(K/S)
     # w = total variance = sigma_BS^2 * T
-    return a + b * (rho * (k - m) + np.sqrt((k - m)**2 + sigma**2))
+    out = np.empty(k.size)
+    sigma_sq = sigma * sigma
+    for i in range(k.size):
+        x = k[i] - m
+        out[i] = a + b * (rho * x + math.sqrt(x * x + sigma_sq))
+    return out
+
+@njit("f8[:](f8[:], f8[:], f8, f8, f8, f8, f8)", cache=True, fastmath=True)
+def _svi_iv(k, T, a, b, rho, m, sigma):
+    """IV per strike from SVI total variance, floored at zero."""
+    out = np.empty(k.size)
+    sigma_sq = sigma * sigma
+    for i in range(k.size):
+        x = k[i] - m
+        w = a + b * (rho * x + math.sqrt(x * x + sigma_sq))
+        out[i] = math.sqrt(max(w, 0.0) / T[i])
+    return out
 
 def fit_svi(strikes, ivs, T, spot):
     """
@@ -17,7 +38,7 @@ def fit_svi(strikes, ivs, T, spot):
     if len(ivs) < 5:
         return None  # Not enough data
 
-    k = np.log(strikes / spot)
+    k = np.log(np.asarray(strikes, dtype=np.float64) / spot)
     w = (ivs ** 2) * T
     
     # Objective function
@@ -41,8 +62,13 @@ def fit_svi(strikes, ivs, T, spot):
         return None
 
 def get_iv_from_surface(strike, T, spot, params):
+    """
+    Model IV from the SVI fit. strike (and T) may be scalars or arrays;
+    negative total variance is floored at zero.
+    """
     if params is None: return None
-    k = np.log(strike / spot)
-    w = svi_raw(k, *params)
-    if w < 0: return 0.0
-    return np.sqrt(w / T)
\ No newline at end of file
+    strike = np.asarray(strike, dtype=np.float64)
+    k = np.log(np.atleast_1d(strike) / spot)
+    T = np.full(k.shape, T, dtype=np.float64)
+    iv = _svi_iv(k, T, *(float(p) for p in params))
+    return iv if strike.ndim else iv[0]
\ No newline at end of file
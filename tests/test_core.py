@@ -1,8 +1,18 @@
+import logging
 import pytest
 import pandas as pd
 import numpy as np
 from covered_calls.features.resistance import detect_resistance
+from covered_calls.features.returns import compute_log_returns
 from covered_calls.options.cleaning import clean_options
+from covered_calls.models.garch import GarchModel
+from covered_calls.montecarlo.breach import calculate_probabilities
+from covered_calls.optimizer.choose_strike import select_strike
+from covered_calls.config import Config
+from covered_calls.options.greeks import calculate_delta, calculate_delta_vec
+from covered_calls.config import get_config
+from covered_calls.io.yahoo_feed import YahooProvider
+from covered_calls.io.cache import cached_fetch
 
 def test_cleaning():
     data = {
@@ -30,4 +40,200 @@ def test_resistance():
     # 5-day max is 110
     # Should detect 110
     assert not res.empty
-    assert res.iloc[0]['level'] >= 101
\ No newline at end of file
+    assert res.iloc[0]['level'] >= 101
+
+def test_garch_update():
+    # Rolling the variance forward must match a full filter with frozen params
+    from arch import arch_model
+    rets = pd.Series(np.random.default_rng(0).standard_t(5, 600) * 0.02)
+    garch = GarchModel(rets[:500])
+    garch.update(rets[500:])
+    ref = arch_model(rets * 100, vol='Garch', p=1, o=1, q=1, dist='t').fix(garch.params)
+    assert np.isclose(np.sqrt(garch.last_sigma2), ref.conditional_volatility.iloc[-1])
+
+def test_terminal_only_matches_full_grid():
+    # Same innovations, so terminal prices and final vols must agree exactly
+    rets = pd.Series(np.random.default_rng(0).standard_t(5, 600) * 0.02)
+    garch = GarchModel(rets, rng=np.random.default_rng(1))
+    prices, vol = garch.simulate_paths(10, 500, 100.0)
+    garch.rng = np.random.default_rng(1)
+    terminal, vol_t = garch.simulate_paths(10, 500, 100.0, terminal_only=True)
+    assert np.array_equal(prices[:, -1], terminal)
+    assert np.array_equal(vol, vol_t)
+
+def test_probabilities_vectorized():
+    prices = np.array([
+        [100.0, 104.0, 101.0],
+        [100.0, 99.0, 98.0],
+        [100.0, 103.0, 106.0],
+        [100.0, 101.0, 102.0],
+    ])
+    p_otm, se_otm, p_touch = calculate_probabilities(prices, np.array([102.0, 105.0]), 1/365, 0.0)
+    assert np.allclose(p_otm, [0.75, 0.75])
+    assert np.allclose(se_otm, np.sqrt(0.75 * 0.25 / 4))
+    # Zero vol disables the bridge term, so touch is the discrete max breach
+    assert np.allclose(p_touch, [0.75, 0.25])
+
+def test_log_returns():
+    daily = pd.DataFrame({'close': [100.0, 110.0, 0.0, 121.0, 133.1]})
+    out = compute_log_returns(daily)
+    # First row has no previous close; rows touching the zero close are dropped
+    assert list(out.index) == [1, 4]
+    assert np.allclose(out['log_ret'], np.log(1.1))
+
+def test_select_strike_filters():
+    calls = pd.DataFrame({
+        'strike':       [95.0, 101.0, 105.0, 110.0, 120.0],
+        'bid':          [6.0,  1.0,   0.9,   0.5,   0.01],
+        'ask':          [6.2,  1.1,   1.0,   0.55,  0.05],
+        'openInterest': [100,  5,     100,   100,   100], # 101 is illiquid
+        'impliedVolatility': 0.5,
+        'dte': 7,
+    })
+    calls['mid'] = (calls['bid'] + calls['ask']) / 2
+    calls['spread'] = calls['ask'] - calls['bid']
+    calls['rel_spread'] = calls['spread'] / calls['mid']
+    calls['side'] = 'call'
+    calls['expiration'] = pd.Timestamp('2026-01-09')
+    calls['underlying_price'] = 100.0
+    # 95 is ITM, 110 has no probability data and 120 is a zombie quote
+    p_otm = {101.0: (0.6, 0.59, 0.4), 105.0: (0.7, 0.68, 0.3), 120.0: (0.95, 0.94, 0.05)}
+    res = pd.DataFrame({'level': [107.0], 'type': ['20d_high'], 'strength': [1.0]})
+    best = select_strike(calls, p_otm, res, Config())
+    assert best['strike'] == 105.0
+    # Spread is wide relative to mid, so the fill crosses 20% of it from the bid
+    assert np.isclose(best['net_premium'], (0.9 + 0.2 * 0.1) * 100 - 2.0)
+    assert best['resistance'] == 107.0
+
+def _call_chain(strikes, iv=0.5):
+    calls = pd.DataFrame({
+        'strike': strikes, 'bid': 1.0, 'ask': 1.1, 'openInterest': 100,
+        'impliedVolatility': iv, 'dte': 7,
+    })
+    calls['mid'] = (calls['bid'] + calls['ask']) / 2
+    calls['spread'] = calls['ask'] - calls['bid']
+    calls['rel_spread'] = calls['spread'] / calls['mid']
+    calls['side'] = 'call'
+    calls['expiration'] = pd.Timestamp('2026-01-09')
+    calls['underlying_price'] = 100.0
+    return calls
+
+def test_select_strike_without_probabilities():
+    # Every strike lacks probability data, so nothing is feasible
+    res = pd.DataFrame({'level': [107.0], 'type': ['20d_high'], 'strength': [1.0]})
+    assert select_strike(_call_chain([105.0, 110.0]), {}, res, Config()) is None
+
+def test_delta_vec_matches_scalar():
+    strikes = np.array([90.0, 100.0, 110.0, 120.0])
+    vols = np.array([0.4, 0.5, 0.0, 0.6])
+    deltas = calculate_delta_vec(100.0, strikes, 7 / 365, vols=vols)
+    expected = [calculate_delta(100.0, K, 7 / 365, vol=v) for K, v in zip(strikes, vols)]
+    assert np.allclose(deltas, expected)
+    assert np.all(calculate_delta_vec(100.0, strikes, 0.0, vols=vols) == 0.0)
+
+def test_select_strike_skips_unscored():
+    # 110 has no IV, so its delta and score are NaN; it must not be picked
+    calls = _call_chain([105.0, 110.0], iv=[0.5, np.nan])
+    p_otm = {105.0: (0.7, 0.68, 0.3), 110.0: (0.8, 0.78, 0.2)}
+    res = pd.DataFrame({'level': [107.0], 'type': ['20d_high'], 'strength': [1.0]})
+    best = select_strike(calls, p_otm, res, Config())
+    assert best['strike'] == 105.0
+    assert np.isfinite(best['score'])
+
+def test_select_strike_pruning_keeps_pick(caplog):
+    # Liquid, tight, all-feasible chain: compare against scoring every strike
+    strikes = np.arange(101.0, 131.0)
+    calls = _call_chain(strikes)
+    calls['mid'] = 3.0 * np.exp(-(strikes - 100.0) / 8.0)
+    calls['bid'], calls['ask'] = calls['mid'] * 0.99, calls['mid'] * 1.01
+    calls['spread'] = calls['ask'] - calls['bid']
+    calls['rel_spread'] = calls['spread'] / calls['mid']
+    p_otm = {K: (0.9, 0.89, 0.1) for K in strikes}
+    res = pd.DataFrame({'level': [115.0], 'type': ['20d_high'], 'strength': [1.0]})
+    cfg = Config()
+    
+    T = 7 / 365
+    yld = ((calls['mid'] * 100 - cfg.commission_fee) / 100.0 / 100.0 * 365 / 7).to_numpy()
+    delta = calculate_delta_vec(100.0, strikes, T, vols=0.5)
+    score = yld - cfg.lambda_res * np.abs(strikes - 115.0) / 100.0 - cfg.lambda_risk * delta
+    score[delta > cfg.max_delta] = -np.inf
+    
+    with caplog.at_level(logging.INFO, logger='covered_calls'):
+        best = select_strike(calls, p_otm, res, cfg)
+    assert best['strike'] == strikes[np.argmax(score)]
+    assert np.isclose(best['score'], score.max())
+    # The bound pass did skip strikes, and the log level does not change the pick
+    assert 'skipped (bound): 0)' not in caplog.text
+    with caplog.at_level(logging.WARNING, logger='covered_calls'):
+        quiet = select_strike(calls, p_otm, res, cfg)
+    assert quiet['strike'] == best['strike'] and quiet['score'] == best['score']
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # Config reads the environment once per get_config() cache
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path))
+    get_config.cache_clear()
+    yield tmp_path
+    get_config.cache_clear()
+
+class _FakeTicker:
+    """yf.Ticker stand-in: business-day bars with the given closes, recording each start."""
+    def __init__(self, closes, splits=0.0):
+        self.closes, self.splits, self.starts = np.asarray(closes, dtype=float), splits, []
+
+    def history(self, start, interval, auto_adjust):
+        self.starts.append(pd.Timestamp(start))
+        idx = pd.date_range('2024-01-01', periods=len(self.closes), freq='B', name='Date')
+        c = self.closes
+        df = pd.DataFrame({'Open': c, 'High': c, 'Low': c, 'Close': c, 'Volume': 1.0,
+                           'Stock Splits': self.splits}, index=idx)
+        return df[df.index >= pd.Timestamp(start).normalize()]
+
+def test_bar_cache_fetches_incrementally(cache_dir):
+    start = pd.Timestamp('2024-01-01')
+    closes = np.linspace(100, 110, 30)
+    YahooProvider._history(_FakeTicker(closes), 'ZZZ', '1d', start)
+    tk = _FakeTicker(np.r_[closes, 111.0])
+    bars = YahooProvider._history(tk, 'ZZZ', '1d', start)
+    # Only the last two cached sessions are refetched: the possibly-open last
+    # one and the closed one used to detect revisions
+    assert tk.starts == [pd.Timestamp('2024-02-08')]
+    assert len(bars) == 31 and bars['timestamp'].is_unique
+    assert np.allclose(bars['close'], np.r_[closes, 111.0])
+
+@pytest.mark.parametrize('split', [False, True])
+def test_bar_cache_rebuilds_on_revision(cache_dir, split):
+    start = pd.Timestamp('2024-01-01')
+    closes = np.linspace(100, 110, 30)
+    YahooProvider._history(_FakeTicker(closes), 'ZZZ', '1d', start)
+    if split:
+        # A split reported on the new session forces a rebuild on its own,
+        # even before the overlap closes show the adjustment
+        tk = _FakeTicker(np.r_[closes, 56.0], np.r_[np.zeros(30), 2.0])
+    else:
+        tk = _FakeTicker(np.r_[closes * 0.9, 100.0])
+    bars = YahooProvider._history(tk, 'ZZZ', '1d', start)
+    assert tk.starts[-1] == start
+    assert np.allclose(bars['close'], tk.closes)
+
+def test_snapshot_eviction_keeps_other_files(cache_dir, monkeypatch):
+    monkeypatch.setenv('QUOTE_CACHE_TTL', '60')
+    get_config.cache_clear()
+    keep = ['ZZZ_yahoo_1d.parquet', 'ZZZX_20200101_6y_extra.pkl', 'notes.txt']
+    old = ['ZZZ_20200101_6y_extra.pkl', 'ZZZ_20200102_2y_daily.parquet']
+    for name in keep + old:
+        (cache_dir / name).write_bytes(b'')
+    
+    bars = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=3), 'close': [1.0, 2.0, 3.0]})
+    calls = []
+    @cached_fetch
+    def fetch(ticker, lookback_years=6):
+        calls.append(ticker)
+        return bars, bars, pd.DataFrame({'strike': [100.0]}), 10.0
+    
+    fetch('ZZZ')
+    _, _, options, spot = fetch('ZZZ')
+    # Second call is served from today's snapshot; only earlier-day ZZZ snapshots are deleted
+    assert calls == ['ZZZ'] and spot == 10.0 and list(options['strike']) == [100.0]
+    names = {p.name for p in cache_dir.iterdir()}
+    assert set(keep) <= names and not names & set(old)